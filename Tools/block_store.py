@@ -0,0 +1,198 @@
+"""
+Block-partitioned plant store.
+
+A farm's plant points are kept as one GeoJSON file per block in a store
+directory, next to a small manifest.json:
+
+    store/
+        manifest.json
+        blocks/F10.geojson
+        blocks/F11.geojson
+        ...
+
+The manifest records the collection header (name, crs), the property the
+blocks are keyed on, and the file, feature count and size of every block in
+farm order. Extracting, dropping or replacing a block only reads or writes
+that block's file (and the manifest); assemble streams the blocks back into
+a single farm file.
+
+Example:
+    store = BlockStore.partition("Bettinelli_plant_points.geojson", "bettinelli_store")
+    store.extract("F10", "F10_block_plants.geojson")
+    store.drop("F10")
+    store.assemble("Bettinelli_plant_points_filtered.geojson")
+"""
+import json
+import os
+import re
+import shutil
+
+from geojson_stream import FeatureWriter, iter_features, read_header
+from plant_index import PlantIndex
+
+MANIFEST_NAME = "manifest.json"
+BLOCKS_DIR = "blocks"
+STORE_VERSION = 1
+
+
+class BlockStore:
+    """A store directory opened through its manifest.json."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+
+    @staticmethod
+    def is_store(path):
+        """True when path is a block store directory."""
+        return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+    @property
+    def block_key(self):
+        return self.manifest["block_key"]
+
+    @property
+    def header(self):
+        return self.manifest["header"]
+
+    @property
+    def blocks(self):
+        """Block names, in farm order."""
+        return [entry["block"] for entry in self.manifest["blocks"]]
+
+    def __contains__(self, block):
+        return self._entry(block) is not None
+
+    # -- creating ------------------------------------------------------------
+
+    @classmethod
+    def create(cls, path, header=None, block_key="block_name", indent=4):
+        """Create an empty store directory."""
+        if cls.is_store(path):
+            raise FileExistsError(f"{path} already holds a block store")
+        os.makedirs(os.path.join(path, BLOCKS_DIR), exist_ok=True)
+        manifest = {
+            "version": STORE_VERSION,
+            "block_key": block_key,
+            "indent": indent,
+            "header": {key: value for key, value in (header or {}).items() if key not in ("type", "features")},
+            "blocks": [],
+        }
+        _write_json(os.path.join(path, MANIFEST_NAME), manifest)
+        return cls(path)
+
+    @classmethod
+    def partition(cls, source_path, path, block_key="block_name", indent=4):
+        """
+        Split a farm GeoJSON file into a new store, one file per block.
+
+        Blocks are read one at a time through the plant index, so only one
+        block file is open at once.
+        """
+        store = cls.create(path, header=read_header(source_path), block_key=block_key, indent=indent)
+        index = PlantIndex.load_or_build(source_path, block_key=block_key)
+
+        # Blocks keep the order in which they first appear in the source file
+        first_position = {block: index.positions[index.block_slice(block)].min() for block in index.blocks}
+        for block in sorted(first_position, key=first_position.get):
+            store.replace(block, index.read_features(index.block_slice(block)))
+        return store
+
+    # -- block operations ----------------------------------------------------
+
+    def _entry(self, block):
+        block = str(block)
+        for entry in self.manifest["blocks"]:
+            if entry["block"] == block:
+                return entry
+        return None
+
+    def block_path(self, block):
+        """Path of a block's GeoJSON file; raises KeyError for unknown blocks."""
+        entry = self._entry(block)
+        if entry is None:
+            raise KeyError(f"Block {block} is not in {self.path}")
+        return os.path.join(self.path, entry["file"])
+
+    def iter_block(self, block):
+        """Yield the features of one block."""
+        return iter_features(self.block_path(block))
+
+    def extract(self, block, output_path):
+        """Copy one block to a standalone GeoJSON file."""
+        shutil.copyfile(self.block_path(block), output_path)
+        return self._entry(block)["count"]
+
+    def replace(self, block, features):
+        """
+        Write (or add) one block from an iterable of features or a GeoJSON file path.
+        New blocks are appended to the farm order.
+        """
+        block = str(block)
+        if isinstance(features, (str, os.PathLike)):
+            features = iter_features(features)
+
+        entry = self._entry(block)
+        if entry is None:
+            entry = {"block": block, "file": self._new_file_name(block)}
+            self.manifest["blocks"].append(entry)
+
+        block_path = os.path.join(self.path, entry["file"])
+        header = dict(self.header, name=block)
+        with FeatureWriter(block_path, header=header, indent=self.manifest.get("indent")) as writer:
+            writer.write_many(features)
+
+        entry["count"] = writer.count
+        entry["bytes"] = os.path.getsize(block_path)
+        self._save()
+        return writer.count
+
+    def drop(self, block):
+        """Remove one block from the store."""
+        block_path = self.block_path(block)
+        self.manifest["blocks"] = [entry for entry in self.manifest["blocks"] if entry["block"] != str(block)]
+        self._save()
+        os.remove(block_path)
+
+    def assemble(self, output_path, blocks=None, exclude=(), indent=4, precision=None, compact=False):
+        """
+        Stream the blocks (all of them by default, in farm order) into one GeoJSON file.
+
+        Parameters:
+        output_path (str): Farm GeoJSON file to write.
+        blocks (list): Blocks to include, in this order.
+        exclude (iterable): Blocks to leave out.
+        precision (int): Round coordinates to this many decimals (None keeps them as stored).
+        compact (bool): Write without whitespace (indent is ignored).
+        """
+        exclude = {str(block) for block in exclude}
+        blocks = [block for block in (self.blocks if blocks is None else blocks) if str(block) not in exclude]
+        with FeatureWriter(output_path, header=self.header, indent=indent, precision=precision,
+                           compact=compact) as writer:
+            for block in blocks:
+                writer.write_many(self.iter_block(block))
+        return writer.count
+
+    # -- manifest --------------------------------------------------------------
+
+    def _new_file_name(self, block):
+        stem = re.sub(r"[^\w.-]", "_", block) or "block"
+        # Compared case-insensitively, for Windows file systems
+        used = {entry["file"].lower() for entry in self.manifest["blocks"]}
+        name, suffix = f"{BLOCKS_DIR}/{stem}.geojson", 1
+        while name.lower() in used:
+            suffix += 1
+            name = f"{BLOCKS_DIR}/{stem}_{suffix}.geojson"
+        return name
+
+    def _save(self):
+        _write_json(os.path.join(self.path, MANIFEST_NAME), self.manifest)
+
+
+def _write_json(path, value):
+    """Write JSON through a temporary file so the manifest is never half written."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(value, f, indent=2)
+    os.replace(tmp_path, path)
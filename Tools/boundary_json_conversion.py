@@ -1,6 +1,13 @@
 import json
 
-def convert_second_to_first_boundary(input_file, output_file):
+from geojson_stream import write_features
+
+def convert_second_to_first_boundary(input_file, output_file, indent=2, precision=None, compact=False):
+    """
+    Convert a boundary file with row_space properties to the block_name /
+    row_spacing layout. precision rounds the written coordinates to that many
+    decimals; compact writes the file without whitespace.
+    """
     with open(input_file, 'r') as f:
         data = json.load(f)
 
@@ -33,9 +40,9 @@ def convert_second_to_first_boundary(input_file, output_file):
         output_data['features'].append(new_feature)
 
     # Write to output JSON
-    with open(output_file, 'w') as f:
-        json.dump(output_data, f, indent=2)
-        print("done")
+    write_features(output_file, output_data['features'], header={"name": output_data["name"], "crs": output_data["crs"]},
+                   indent=indent, precision=precision, compact=compact)
+    print("done")
 
 # Example usage
 convert_second_to_first_boundary(
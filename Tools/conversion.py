@@ -1,51 +1,114 @@
 import json
+import os
+from functools import lru_cache
 
-def convert_first_to_second(input_file, output_file):
-    with open(input_file, 'r') as f:
-        data = json.load(f)
-
-    # Update CRS
-    output_data = {
-        "type": "FeatureCollection",
-        "name": "plants",
-        "crs": {
-            "type": "name",
-            "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}
-        },
-        "features": []
-    }
-
-    for feature in data['features']:
-        properties = feature['properties']
-        coordinates = feature['geometry']['coordinates']
-
-        # Convert coordinates from UTM to Lat/Lon (assuming EPSG:32610 to WGS84)
-        import pyproj
-        transformer = pyproj.Transformer.from_crs("epsg:32610", "epsg:4326", always_xy=True)
-        lon, lat = transformer.transform(coordinates[0], coordinates[1])
-
-        # Create the new feature
-        new_feature = {
-            "type": "Feature",
-            "properties": {
-                "farm_id": "Bettinelli",
-                "block_id": properties['block_name'],
-                "plant_id": properties['plant_id'],
-                "row_id": properties['row_id']
-            },
-            "geometry": {
-                "type": "Point",
-                "coordinates": [lon, lat]
+import numpy as np
+import pandas as pd
+import pyproj
+
+from geojson_stream import write_features
+from instrumentation import report, stage
+from plant_store import is_columnar_path, read_plant_table, table_to_features, write_plant_table
+
+
+WGS84_CRS_NAME = "urn:ogc:def:crs:OGC:1.3:CRS84"
+
+
+def geojson_crs(crs):
+    """
+    GeoJSON crs member of a CRS (anything pyproj accepts).
+
+    Geographic WGS84 is named CRS84, the (lon, lat) name every tool here writes.
+    Other CRSs get their authority URN, e.g. urn:ogc:def:crs:EPSG::32610.
+    """
+    crs = pyproj.CRS.from_user_input(crs)
+    if crs.equals(pyproj.CRS("OGC:CRS84"), ignore_axis_order=True):
+        name = WGS84_CRS_NAME
+    else:
+        authority = crs.to_authority()
+        name = f"urn:ogc:def:crs:{authority[0]}::{authority[1]}" if authority else crs.srs
+    return {"type": "name", "properties": {"name": name}}
+
+
+@lru_cache(maxsize=None)
+def get_transformer(src_crs, dst_crs):
+    """Return a cached pyproj Transformer for (src_crs, dst_crs), built once per process."""
+    return pyproj.Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+
+def transform_coordinates(coordinates, src_crs="epsg:32610", dst_crs="epsg:4326"):
+    """Transform a list of [x, y] pairs in one array call and return (xs, ys) arrays."""
+    coords = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+    transformer = get_transformer(src_crs, dst_crs)
+    xs, ys = transformer.transform(coords[:, 0], coords[:, 1])
+    return np.asarray(xs), np.asarray(ys)
+
+
+def convert_first_to_second(input_file, output_file, src_crs="epsg:32610", dst_crs="epsg:4326", indent=2,
+                            precision=None, compact=False):
+    """
+    Converts a plant layer from UTM to Lat/Lon in the delivery format.
+
+    Either file may be GeoJSON or a columnar plant file (.parquet / .arrow),
+    chosen by its extension. precision rounds the converted coordinates to
+    that many decimals (8 is about 1 mm in degrees); compact writes GeoJSON
+    without whitespace.
+    """
+    with stage("read") as read:
+        if is_columnar_path(input_file):
+            table, _ = read_plant_table(input_file)
+            block_names, plant_ids, row_ids = table['block_name'], table['plant_id'], table['row_id']
+            coordinates = table[['x', 'y']].to_numpy()
+        else:
+            with open(input_file, 'r') as f:
+                data = json.load(f)
+            properties = [feature['properties'] for feature in data['features']]
+            block_names = [p['block_name'] for p in properties]
+            plant_ids = [p['plant_id'] for p in properties]
+            row_ids = [p['row_id'] for p in properties]
+            coordinates = [feature['geometry']['coordinates'][:2] for feature in data['features']]
+        read.add(accepted=len(coordinates))
+
+    # Convert coordinates from UTM to Lat/Lon (assuming EPSG:32610 to WGS84) for all features at once
+    with stage("reproject", candidates=len(coordinates)):
+        lons, lats = transform_coordinates(coordinates, src_crs, dst_crs)
+        if precision is not None:
+            lons, lats = np.round(lons, precision), np.round(lats, precision)
+
+    # Object columns keep the ids as they were read: a null id must not turn
+    # the whole column into floats
+    output_table = pd.DataFrame({
+        "farm_id": "Bettinelli",
+        "block_id": pd.Series(block_names, dtype=object).to_numpy(),
+        "plant_id": pd.Series(plant_ids, dtype=object).to_numpy(),
+        "row_id": pd.Series(row_ids, dtype=object).to_numpy(),
+        "x": lons,
+        "y": lats,
+    })
+
+    with stage("write", accepted=len(output_table)) as write:
+        if is_columnar_path(output_file):
+            write_plant_table(output_file, output_table, crs="OGC:CRS84")
+        else:
+            # Update CRS
+            header = {
+                "name": "plants",
+                "crs": {
+                    "type": "name",
+                    "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}
+                },
             }
-        }
-        output_data['features'].append(new_feature)
-
-    # Write to output JSON
-    with open(output_file, 'w') as f:
-        json.dump(output_data, f, indent=2)
-
-# Example usage
-convert_first_to_second(
-    'E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/F10_block_plants_filtered.geojson',
-    'E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/F10_block_plants_KD.geojson'
-    )
+
+            # Stream the features to the output JSON
+            write_features(output_file, table_to_features(output_table), header=header, indent=indent,
+                           compact=compact)
+        write.add(bytes_written=os.path.getsize(output_file))
+
+    report("convert_first_to_second")
+
+if __name__ == "__main__":
+    # Example usage
+    convert_first_to_second(
+        'E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/F10_block_plants_filtered.geojson',
+        'E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/F10_block_plants_KD.geojson'
+        )
@@ -1,29 +1,47 @@
-import json
+from block_store import BlockStore
+from geojson_stream import FeatureWriter, read_header, write_features
+from instrumentation import report, stage
+from plant_index import PlantIndex
 
-def filter_geojson(input_file, output_file, block_id):
-    # Load the GeoJSON file
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # Filter features based on block_id
-    filtered_features = [feature for feature in data["features"] if feature["properties"].get("block_name") == block_id]
+def filter_geojson(input_file, output_file, block_id, indent=4, precision=None, compact=False):
+    # A block store already holds the block as its own file; it is only
+    # rewritten when the output should be rounded or compacted
+    if BlockStore.is_store(input_file):
+        store = BlockStore(input_file)
+        if precision is None and not compact:
+            store.extract(block_id, output_file)
+        else:
+            write_features(output_file, store.iter_block(block_id), header=dict(store.header, name=str(block_id)),
+                           precision=precision, compact=compact)
+        print(f"Filtered GeoJSON saved to {output_file}")
+        return
+
+    # Read the header only; features are read through the plant index below
+    header = read_header(input_file)
+
+    # Filter features based on block_id: one slice of the (cached) block_name index
+    index = PlantIndex.load_or_build(input_file, block_key="block_name")
+    filtered_features = index.read_features(index.block_slice(block_id))
     
     # Create new GeoJSON structure with filtered features
-    filtered_geojson = {
-        "type": "FeatureCollection",
-        "name": data.get("name", "filtered"),
-        "crs": data.get("crs"),
-        "features": filtered_features
+    filtered_header = {
+        "name": header.get("name", "filtered"),
+        "crs": header.get("crs"),
     }
     
     # Save the filtered GeoJSON to a new file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(filtered_geojson, f, indent=4)
+    with stage("write", block=block_id) as write:
+        with FeatureWriter(output_file, header=filtered_header, indent=indent, precision=precision,
+                           compact=compact) as writer:
+            writer.write_many(filtered_features)
+        write.add(accepted=writer.count, bytes_written=writer.bytes_written)
     
     print(f"Filtered GeoJSON saved to {output_file}")
+    report("filter_geojson")
 
-# Example usage
-filter_geojson("E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/F10_block_plants.geojson",
-                "E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/F10_block_plants_filtered.geojson", 
-                "F10"
-            )
+if __name__ == "__main__":
+    # Example usage
+    filter_geojson("E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/F10_block_plants.geojson",
+                    "E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/F10_block_plants_filtered.geojson", 
+                    "F10"
+                )
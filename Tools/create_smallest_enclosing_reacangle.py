@@ -132,68 +132,8 @@
 
 
 
-import json
-import numpy as np
-import geojson
-from scipy.spatial import ConvexHull
-
-def minimum_area_bounding_box(geojson_path, output_path):
-    with open(geojson_path, 'r') as f:
-        geojson_data = json.load(f)
-    
-    polygon = np.array(geojson_data["features"][0]["geometry"]["coordinates"][0])
-    hull = ConvexHull(polygon)
-    hull_points = polygon[hull.vertices]
-    
-    min_area = float('inf')
-    best_rect = None
-    for i in range(len(hull_points)):
-        p1, p2 = hull_points[i], hull_points[(i+1) % len(hull_points)]
-        edge_vector = p2 - p1
-        angle = np.arctan2(edge_vector[1], edge_vector[0])
-        
-        rot_matrix = np.array([[np.cos(-angle), -np.sin(-angle)], [np.sin(-angle), np.cos(-angle)]])
-        rotated_points = np.dot(hull_points - p1, rot_matrix.T)
-        
-        min_x, max_x = rotated_points[:, 0].min(), rotated_points[:, 0].max()
-        min_y, max_y = rotated_points[:, 1].min(), rotated_points[:, 1].max()
-        
-        area = (max_x - min_x) * (max_y - min_y)
-        if area < min_area:
-            min_area = area
-            best_rect = np.array([
-                [min_x, max_y],
-                [max_x, max_y],
-                [max_x, min_y],
-                [min_x, min_y],
-                [min_x, max_y]
-            ])
-            best_angle = angle
-            best_origin = p1
-    
-    inv_rot_matrix = np.array([[np.cos(best_angle), -np.sin(best_angle)], [np.sin(best_angle), np.cos(best_angle)]])
-    bounding_box_coords = np.dot(best_rect, inv_rot_matrix.T) + best_origin
-    
-    bounding_box_coords = bounding_box_coords.tolist()
-    
-    bounding_box_geojson = {
-        "type": "FeatureCollection",
-        "features": [
-            {
-                "type": "Feature",
-                "properties": {"name": "oriented_bounding_box"},
-                "geometry": {
-                    "type": "Polygon",
-                    "coordinates": [bounding_box_coords]
-                }
-            }
-        ]
-    }
-    
-    with open(output_path, 'w') as f:
-        json.dump(bounding_box_geojson, f, indent=4)
-    
-    return bounding_box_geojson
+# Minimum-area rectangle (vectorized over all hull edges) lives in generate_points_from_boundary.py
+from generate_points_from_boundary import minimum_area_bounding_box
 
 # def generate_parallel_points(bbox_geojson, plant_spacing=5, row_spacing=6, num_rows=10, num_points_per_row=100, output_path="points.geojson"):
 #     bbox_coords = np.array(bbox_geojson["features"][0]["geometry"]["coordinates"][0])[:-1]
@@ -424,6 +364,8 @@ import json
 import geopy.distance
 import numpy as np
 
+from geojson_stream import write_features
+
 def calculate_distance(p1, p2):
     """Calculate geodesic distance between two points."""
     return geopy.distance.geodesic((p1[1], p1[0]), (p2[1], p2[0])).meters
@@ -514,8 +456,7 @@ if __name__ == "__main__":
 
     result = generate_parallel_rows(boundary_json)
 
-    with open("generated_parallel_rows.geojson", "w") as f:
-        json.dump(result, f, indent=4)
+    write_features("generated_parallel_rows.geojson", result["features"], indent=4)
 
     print("GeoJSON file saved as 'generated_parallel_rows.geojson'")
 
@@ -527,40 +468,8 @@ print(bb_points)
 
 
 
-import json
-from shapely.geometry import shape, Point
-
-def filter_points_outside_boundary(boundary_json_path, points_json_path, output_json_path):
-    # Load boundary polygon
-    with open(boundary_json_path, "r", encoding="utf-8") as f:
-        boundary_data = json.load(f)
-    
-    boundary_polygon = shape(boundary_data["features"][0]["geometry"])
-
-    # Load points
-    with open(points_json_path, "r", encoding="utf-8") as f:
-        points_data = json.load(f)
-
-    filtered_features = []
-
-    for feature in points_data["features"]:
-        point = Point(feature["geometry"]["coordinates"])
-        
-        # Keep only points outside the boundary
-        if boundary_polygon.contains(point):
-            filtered_features.append(feature)
-
-    # Create the new GeoJSON with filtered points
-    filtered_geojson = {
-        "type": "FeatureCollection",
-        "features": filtered_features
-    }
-
-    # Save to output file
-    with open(output_json_path, "w", encoding="utf-8") as f:
-        json.dump(filtered_geojson, f, indent=4)
-
-    print(f"Filtered points saved to {output_json_path}")
+# Bulk filtering (prepared geometry / STRtree) lives in generate_points_from_boundary.py
+from generate_points_from_boundary import filter_points_outside_boundary
 
 # Example usage
 boundary_json_path = "boundary_generated_kd.geojson"
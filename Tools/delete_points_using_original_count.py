@@ -1,63 +1,106 @@
-import json
+import numpy as np
 import pandas as pd
 
-def filter_geojson_by_excel(geojson_path, excel_path, output_path):
-    # Load GeoJSON
-    with open(geojson_path, 'r') as f:
-        geojson_data = json.load(f)
-
-    # Load Excel file (assumes first sheet)
-    excel_data = pd.read_excel(excel_path)
-
-    # Get the unique block_id from the Excel file (assumes only one block_id present)
-    target_block_id = excel_data['block_id'].unique()[0]
-
-    # Filter GeoJSON features that match the block_name
-    matching_features = [
-        feature for feature in geojson_data['features']
-        if feature['properties']['block_name'] == target_block_id
-    ]
-
-    # Group features by row_id
-    features_by_row = {}
-    for feature in matching_features:
-        row_id = feature['properties']['row_id']
-        features_by_row.setdefault(row_id, []).append(feature)
-
-    # Prepare new filtered features list
-    filtered_features = []
-
-    # Iterate through each row group in the Excel
-    for _, row in excel_data.iterrows():
-        row_number = row['row_number']
-        current_plant_count = row['current_plant_count']
-
-        if row_number in features_by_row:
-            # Sort the features by plant_id
-            row_features = sorted(
-                features_by_row[row_number],
-                key=lambda x: x['properties']['plant_id']
-            )
-            # Keep only the features up to current_plant_count
-            filtered_features.extend(row_features[:current_plant_count])
+from geojson_stream import FeatureWriter, read_header
+from instrumentation import report, stage
+from plant_index import PlantIndex
+from plant_store import is_columnar_path, read_plant_table, write_plant_table
+
+REPORT_COLUMNS = ["block_id", "row_number", "current_plant_count"]
+
+def read_count_report(excel_path, sheet_name=0):
+    """
+    Load a vine count report as one (block_id, row_number, current_plant_count) table.
+
+    :param sheet_name: Sheet to read (first sheet by default); None reads and
+        stacks every sheet, so one workbook can cover a whole farm.
+    """
+    sheets = pd.read_excel(excel_path, sheet_name=sheet_name)
+    if isinstance(sheets, dict):
+        sheets = [sheet for sheet in sheets.values() if set(REPORT_COLUMNS) <= set(sheet.columns)]
+        if not sheets:
+            raise ValueError(f"No sheet of {excel_path} has the columns {REPORT_COLUMNS}")
+        sheets = pd.concat(sheets, ignore_index=True)
+
+    count_report = sheets[REPORT_COLUMNS].dropna()
+    count_report = count_report.astype({"row_number": np.int64, "current_plant_count": np.int64})
+    count_report["block_id"] = count_report["block_id"].astype(str)
+
+    # A row reported twice keeps its last count
+    return count_report.drop_duplicates(["block_id", "row_number"], keep="last")
+
+def plants_to_keep(block_names, row_ids, ranks, count_report):
+    """
+    Boolean mask of the plants to keep: a plant stays when its rank in its row
+    (0 for the lowest plant_id) is below the row's current_plant_count.
+    Plants of rows missing from the report are dropped, as are plants whose
+    row_id is not a number.
+    """
+    row_numbers = pd.to_numeric(pd.Series(row_ids, dtype=object), errors="coerce").astype(np.float64)
+    plants = pd.DataFrame({"block_id": np.asarray(block_names).astype(str), "row_number": row_numbers.to_numpy()})
+    count_report = count_report.astype({"row_number": np.float64})
+    counts = plants.merge(count_report, how="left", on=["block_id", "row_number"])["current_plant_count"]
+    return np.asarray(ranks) < counts.fillna(0).to_numpy()
+
+def filter_plant_table(table, count_report):
+    """Truncate every reported row of a plant table (block_name, row_id, plant_id columns)."""
+    by_plant = table.sort_values("plant_id", kind="stable")
+    ranks = by_plant.groupby(["block_name", "row_id"], sort=False).cumcount().reindex(table.index)
+    return table[plants_to_keep(table["block_name"], table["row_id"], ranks, count_report)]
+
+def filter_geojson_by_excel(geojson_path, excel_path, output_path, sheet_name=0, indent=4, precision=None,
+                            compact=False):
+    """
+    Keep the first current_plant_count plants (by plant_id) of every row listed
+    in the vine count report, for every block in it, in one vectorized pass.
+
+    :param sheet_name: Report sheet to use; None uses every sheet.
+    :param precision: Round GeoJSON coordinates to this many decimals (None keeps them as read).
+    :param compact: Write GeoJSON without whitespace (indent is ignored).
+    """
+    count_report = read_count_report(excel_path, sheet_name=sheet_name)
+
+    if is_columnar_path(geojson_path):
+        # Not memory-mapped, so the input can be overwritten
+        table, crs = read_plant_table(geojson_path, memory_map=False)
+        with stage("truncate", candidates=len(table)) as truncate:
+            filtered = filter_plant_table(table, count_report)
+            truncate.add(accepted=len(filtered))
+        write_plant_table(output_path, filtered, crs=crs)
+        print(f"Filtered plant table saved to {output_path}")
+        report("filter_geojson_by_excel")
+        return
+
+    # Index entries are sorted by (block_name, row_id, plant_id), so the rank of
+    # a plant in its row is its offset from the start of the row's run
+    index = PlantIndex.load_or_build(geojson_path, block_key="block_name")
+    with stage("truncate", candidates=len(index)) as truncate:
+        entries = pd.DataFrame({"block": index.block_codes, "row": index.row_codes})
+        ranks = entries.groupby(["block", "row"], sort=False).cumcount().to_numpy()
+        keep = np.flatnonzero(plants_to_keep(index.blocks[index.block_codes], index.row_ids, ranks, count_report))
+        truncate.add(accepted=len(keep))
 
     # Construct new GeoJSON with the same structure
-    new_geojson = {
-        "type": "FeatureCollection",
-        "name": geojson_data.get("name", "filtered"),
-        "crs": geojson_data.get("crs"),
-        "features": filtered_features
+    header = read_header(geojson_path)
+    new_header = {
+        "name": header.get("name", "filtered"),
+        "crs": header.get("crs"),
     }
 
-    # Save to output file
-    with open(output_path, 'w') as f:
-        json.dump(new_geojson, f, indent=4)
+    # Read only the kept features (in file order) and stream them to the output file
+    with stage("write") as write:
+        with FeatureWriter(output_path, header=new_header, indent=indent, precision=precision,
+                           compact=compact) as writer:
+            writer.write_many(index.read_features(keep))
+        write.add(accepted=writer.count, bytes_written=writer.bytes_written)
 
     print(f"Filtered GeoJSON saved to {output_path}")
+    report("filter_geojson_by_excel")
 
 
 
 
-filter_geojson_by_excel("E:/plant_point_generate_using_boundary_json/mayacamas/21b_block_updated.geojson",
-                       "E:/plant_point_generate_using_boundary_json/mayacamas/vine_count_report_21b.xlsx", 
-                       "E:/plant_point_generate_using_boundary_json/mayacamas/21b_block_updated.geojson")
+if __name__ == "__main__":
+    filter_geojson_by_excel("E:/plant_point_generate_using_boundary_json/mayacamas/21b_block_updated.geojson",
+                           "E:/plant_point_generate_using_boundary_json/mayacamas/vine_count_report_21b.xlsx", 
+                           "E:/plant_point_generate_using_boundary_json/mayacamas/21b_block_updated.geojson")
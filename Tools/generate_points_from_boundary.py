@@ -1,51 +1,130 @@
 import json
+import os
 import numpy as np
 import geojson
 import geopy.distance
+import pyproj
+import shapely
 from scipy.spatial import ConvexHull
-from shapely.geometry import shape, Point
+from shapely.geometry import shape
 
+from geojson_stream import write_features
+from instrumentation import report, stage
+from plant_store import features_to_table, is_columnar_path, read_plant_table, table_to_features, write_plant_table
 
 
 
 
+
+# Largest (hull vertex x edge) projection array built at once by minimum_area_rectangle
+HULL_PROJECTION_SIZE = 1 << 22
+
 #minimum area rectangle
-def minimum_area_bounding_box(geojson_path, output_path):
+def minimum_area_rectangle(points):
+    """
+    Oriented minimum-area rectangle of a set of points.
+
+    The optimal rectangle has one side on a convex hull edge, so every hull
+    edge direction is tried: the hull is projected onto the edge directions
+    and their normals with matrix products, a block of edges at a time so
+    memory stays bounded for hulls with many vertices. When two edges give
+    areas within rounding of each other, either rectangle may be returned.
+
+    Returns (closed 5x2 corner array, angle of the chosen edge in radians, area).
+    """
+    points = np.asarray(points, dtype=float)[:, :2]
+    hull_points = points[ConvexHull(points).vertices]
+
+    # Work relative to the hull centre to keep lon/lat and UTM values well conditioned
+    center = hull_points.mean(axis=0)
+    hull_local = hull_points - center
+
+    edges = np.roll(hull_local, -1, axis=0) - hull_local
+    angles = np.arctan2(edges[:, 1], edges[:, 0])
+    directions = np.column_stack((np.cos(angles), np.sin(angles)))
+    normals = np.column_stack((-directions[:, 1], directions[:, 0]))
+
+    # (hull vertex, edge) projections, for at most HULL_PROJECTION_SIZE entries at a time
+    min_x, max_x, min_y, max_y = (np.empty(len(edges)) for _ in range(4))
+    block_size = max(1, HULL_PROJECTION_SIZE // len(hull_local))
+    for start in range(0, len(edges), block_size):
+        block = slice(start, start + block_size)
+        along = hull_local @ directions[block].T
+        across = hull_local @ normals[block].T
+        min_x[block], max_x[block] = along.min(axis=0), along.max(axis=0)
+        min_y[block], max_y[block] = across.min(axis=0), across.max(axis=0)
+    areas = (max_x - min_x) * (max_y - min_y)
+
+    best = np.argmin(areas)
+    u, v = directions[best], normals[best]
+    rect = np.array([
+        [min_x[best], max_y[best]],
+        [max_x[best], max_y[best]],
+        [max_x[best], min_y[best]],
+        [min_x[best], min_y[best]],
+        [min_x[best], max_y[best]]
+    ])
+    corners = rect[:, :1] * u + rect[:, 1:] * v + center
+    return corners, angles[best], areas[best]
+
+def minimum_area_rectangles(boundary_geojson):
+    """
+    Minimum-area rectangles of every polygon feature in a boundary FeatureCollection.
+
+    Returns a list with one dict per feature: properties (copied from the
+    feature), coordinates (closed ring), angle (degrees) and area (in CRS units).
+    """
+    rectangles = []
+    for feature in boundary_geojson["features"]:
+        geometry = shape(feature["geometry"])
+        corners, angle, area = minimum_area_rectangle(shapely.get_coordinates(geometry))
+        rectangles.append({
+            "properties": dict(feature.get("properties") or {}),
+            "coordinates": corners.tolist(),
+            "angle": float(np.degrees(angle)),
+            "area": float(area),
+        })
+    return rectangles
+
+def minimum_area_bounding_boxes(geojson_path, output_path=None, indent=4, precision=None, compact=False):
+    """
+    Write the minimum-area rectangle of every boundary polygon in geojson_path (optional) and return them.
+    precision rounds the written coordinates to that many decimals; compact
+    writes the file without whitespace.
+    """
+    with open(geojson_path, 'r') as f:
+        geojson_data = json.load(f)
+
+    rectangles = minimum_area_rectangles(geojson_data)
+
+    bounding_boxes_geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {**rectangle["properties"], "name": "oriented_bounding_box",
+                               "angle": rectangle["angle"], "area": rectangle["area"]},
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [rectangle["coordinates"]]
+                }
+            }
+            for rectangle in rectangles
+        ]
+    }
+
+    if output_path:
+        write_features(output_path, bounding_boxes_geojson["features"], indent=indent, precision=precision,
+                       compact=compact)
+
+    return bounding_boxes_geojson
+
+def minimum_area_bounding_box(geojson_path, output_path, indent=4, precision=None, compact=False):
     with open(geojson_path, 'r') as f:
         geojson_data = json.load(f)
     
     polygon = np.array(geojson_data["features"][0]["geometry"]["coordinates"][0])
-    hull = ConvexHull(polygon)
-    hull_points = polygon[hull.vertices]
-    
-    min_area = float('inf')
-    best_rect = None
-    for i in range(len(hull_points)):
-        p1, p2 = hull_points[i], hull_points[(i+1) % len(hull_points)]
-        edge_vector = p2 - p1
-        angle = np.arctan2(edge_vector[1], edge_vector[0])
-        
-        rot_matrix = np.array([[np.cos(-angle), -np.sin(-angle)], [np.sin(-angle), np.cos(-angle)]])
-        rotated_points = np.dot(hull_points - p1, rot_matrix.T)
-        
-        min_x, max_x = rotated_points[:, 0].min(), rotated_points[:, 0].max()
-        min_y, max_y = rotated_points[:, 1].min(), rotated_points[:, 1].max()
-        
-        area = (max_x - min_x) * (max_y - min_y)
-        if area < min_area:
-            min_area = area
-            best_rect = np.array([
-                [min_x, max_y],
-                [max_x, max_y],
-                [max_x, min_y],
-                [min_x, min_y],
-                [min_x, max_y]
-            ])
-            best_angle = angle
-            best_origin = p1
-    
-    inv_rot_matrix = np.array([[np.cos(best_angle), -np.sin(best_angle)], [np.sin(best_angle), np.cos(best_angle)]])
-    bounding_box_coords = np.dot(best_rect, inv_rot_matrix.T) + best_origin
+    bounding_box_coords, _, _ = minimum_area_rectangle(polygon)
     
     bounding_box_coords = bounding_box_coords.tolist()
     
@@ -63,8 +142,7 @@ def minimum_area_bounding_box(geojson_path, output_path):
         ]
     }
     
-    with open(output_path, 'w') as f:
-        json.dump(bounding_box_geojson, f, indent=4)
+    write_features(output_path, bounding_box_geojson["features"], indent=indent, precision=precision, compact=compact)
     
     return bounding_box_geojson
 
@@ -87,8 +165,34 @@ def calculate_bearing(p1, p2):
     y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(delta_lon)
     return (np.degrees(np.arctan2(x, y)) + 360) % 360  # Normalize
 
-def generate_parallel_rows(boundary_json, num_points=100, row_spacing=2.1):
-    """Generate multiple rows of points spaced along the shortest side."""
+# Ellipsoid used by geopy.distance.distance (WGS-84)
+WGS84_GEOD = pyproj.Geod(ellps="WGS84")
+
+def geod_destination(lons, lats, bearing, distances):
+    """Solve the geodesic forward problem for whole arrays of start points and distances."""
+    distances = np.asarray(distances, dtype=float)
+    lons = np.broadcast_to(np.asarray(lons, dtype=float), distances.shape)
+    lats = np.broadcast_to(np.asarray(lats, dtype=float), distances.shape)
+    azimuths = np.full(distances.shape, float(bearing))
+    dest_lons, dest_lats, _ = WGS84_GEOD.fwd(lons.ravel(), lats.ravel(), azimuths.ravel(), distances.ravel())
+    return np.reshape(dest_lons, distances.shape), np.reshape(dest_lats, distances.shape)
+
+def local_metric_transformer(origin):
+    """Transformer from WGS84 to an azimuthal equidistant projection centred on origin (lon, lat)."""
+    local_crs = pyproj.CRS.from_proj4(
+        f"+proj=aeqd +lat_0={origin[1]} +lon_0={origin[0]} +datum=WGS84 +units=m +no_defs"
+    )
+    return pyproj.Transformer.from_crs("EPSG:4326", local_crs, always_xy=True)
+
+def generate_parallel_rows(boundary_json, num_points=100, row_spacing=2.1, method="geodesic"):
+    """
+    Generate multiple rows of points spaced along the shortest side.
+
+    method selects how the points are laid out:
+        "geodesic"  - one geopy destination solve per coordinate (original behaviour)
+        "geod"      - batched ellipsoidal forward solve with pyproj.Geod arrays
+        "projected" - project the row ends to a local azimuthal equidistant CRS and use array arithmetic
+    """
     polygon_coords = boundary_json["features"][0]["geometry"]["coordinates"][0][:-1]
 
     # Identify the longest and shortest sides
@@ -106,6 +210,27 @@ def generate_parallel_rows(boundary_json, num_points=100, row_spacing=2.1):
     
     # Generate multiple rows
     geojson_output = {"type": "FeatureCollection", "features": []}
+
+    if method != "geodesic":
+        if method == "geod":
+            points = generate_parallel_rows_geod(longest_side[0], num_rows, num_points, row_spacing,
+                                                 short_length, short_bearing, long_bearing)
+        elif method == "projected":
+            points = generate_parallel_rows_projected(longest_side[0], num_rows, num_points, row_spacing,
+                                                      short_length, short_bearing, long_bearing)
+        else:
+            raise ValueError(f"Unknown method: {method}")
+
+        lons, lats = points
+        row_ids = np.repeat(np.arange(1, num_rows + 1), num_points)
+        for plant_id, (row_id, lon, lat) in enumerate(zip(row_ids.tolist(), lons.ravel().tolist(), lats.ravel().tolist()), start=1):
+            geojson_output["features"].append({
+                "type": "Feature",
+                "properties": {"plant_id": plant_id, "row_id": row_id},
+                "geometry": {"type": "Point", "coordinates": (lon, lat)}
+            })
+        return geojson_output
+
     plant_id = 1
 
     for row in range(num_rows):
@@ -139,39 +264,120 @@ def generate_parallel_rows(boundary_json, num_points=100, row_spacing=2.1):
 
     return geojson_output
 
-
-
-def filter_points_outside_boundary(boundary_json_path, points_json_path, output_json_path):
-    # Load boundary polygon
-    with open(boundary_json_path, "r", encoding="utf-8") as f:
-        boundary_data = json.load(f)
-    
-    boundary_polygon = shape(boundary_data["features"][0]["geometry"])
-
-    # Load points
-    with open(points_json_path, "r", encoding="utf-8") as f:
-        points_data = json.load(f)
-
-    filtered_features = []
-
-    for feature in points_data["features"]:
-        point = Point(feature["geometry"]["coordinates"])
-        
-        # Keep only points outside the boundary
-        if boundary_polygon.contains(point):
-            filtered_features.append(feature)
-
-    # Create the new GeoJSON with filtered points
-    filtered_geojson = {
-        "type": "FeatureCollection",
-        "features": filtered_features
-    }
-
-    # Save to output file
-    with open(output_json_path, "w", encoding="utf-8") as f:
-        json.dump(filtered_geojson, f, indent=4)
+def generate_parallel_rows_geod(origin, num_rows, num_points, row_spacing, short_length, short_bearing, long_bearing):
+    """Row layout with two batched geodesic solves: one for the row starts, one for every plant."""
+    spacing = short_length / (num_points - 1)
+    start_lons, start_lats = geod_destination(origin[0], origin[1], long_bearing, np.arange(num_rows) * row_spacing)
+
+    plant_distances = np.broadcast_to(np.arange(num_points) * spacing, (num_rows, num_points))
+    return geod_destination(start_lons[:, None], start_lats[:, None], short_bearing, plant_distances)
+
+def generate_parallel_rows_projected(origin, num_rows, num_points, row_spacing, short_length, short_bearing, long_bearing):
+    """
+    Row layout in a local metric CRS centred on the first corner, transformed back in one call.
+
+    Only distances and azimuths measured from the projection centre are true in
+    azimuthal equidistant, so a single flat direction for every row drifts from
+    the geodesic layout as the block grows (centimetres on a 1500 x 400 m block).
+    Instead, the start and end of every row are solved with pyproj.Geod and
+    projected, and the plants are spaced evenly between them in the plane. This
+    matches the geodesic points to within 0.02 mm up to 3000 x 1500 m blocks;
+    "geod" gives the same points and is usually a little faster.
+    """
+    # Row starts along the long side and row ends along the short bearing, on the ellipsoid
+    start_lons, start_lats = geod_destination(origin[0], origin[1], long_bearing, np.arange(num_rows) * row_spacing)
+    end_lons, end_lats = geod_destination(start_lons, start_lats, short_bearing, np.full(num_rows, float(short_length)))
+
+    transformer = local_metric_transformer(origin)
+    start_x, start_y = transformer.transform(start_lons, start_lats)
+    end_x, end_y = transformer.transform(end_lons, end_lats)
+
+    # Plants evenly spaced along each projected row
+    fraction = np.arange(num_points)[None, :] / (num_points - 1)
+    x = start_x[:, None] + fraction * (end_x - start_x)[:, None]
+    y = start_y[:, None] + fraction * (end_y - start_y)[:, None]
+
+    lons, lats = transformer.transform(x, y, direction="INVERSE")
+    return np.asarray(lons), np.asarray(lats)
+
+def points_inside_boundaries(x, y, boundary_geoms):
+    """
+    Return a boolean mask of the points that lie inside any boundary geometry.
+
+    A single boundary is prepared and tested with shapely.contains_xy on the
+    coordinate arrays; many boundaries go through an STRtree so each point is
+    only tested against the polygons whose envelope it falls in.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    with stage("containment", candidates=len(x)) as containment:
+        if len(boundary_geoms) == 1:
+            boundary_polygon = boundary_geoms[0]
+            shapely.prepare(boundary_polygon)
+            inside = shapely.contains_xy(boundary_polygon, x, y)
+        else:
+            tree = shapely.STRtree(boundary_geoms)
+            point_index, _ = tree.query(shapely.points(x, y), predicate="within")
+            inside = np.zeros(len(x), dtype=bool)
+            inside[point_index] = True
+        containment.add(accepted=np.count_nonzero(inside))
+    return inside
+
+
+def filter_points_outside_boundary(boundary_json_path, points_json_path, output_json_path, all_boundaries=False,
+                                   indent=4, precision=None, compact=False):
+    """
+    Keep only the points that fall inside the boundary.
+
+    By default only the first boundary feature is used; with all_boundaries=True
+    a point is kept when it falls inside any boundary feature of the file.
+    The points and output paths may also be columnar plant files (.parquet / .arrow).
+    precision rounds the coordinates of a GeoJSON output to that many decimals;
+    compact writes it without whitespace.
+    """
+    # Load boundary polygon(s) and points (GeoJSON or a columnar plant file)
+    with stage("read") as read:
+        with open(boundary_json_path, "r", encoding="utf-8") as f:
+            boundary_data = json.load(f)
+
+        boundary_features = boundary_data["features"] if all_boundaries else boundary_data["features"][:1]
+        boundary_geoms = [shape(feature["geometry"]) for feature in boundary_features]
+
+        if is_columnar_path(points_json_path):
+            points_table, points_crs = read_plant_table(points_json_path)
+            x, y = points_table["x"].to_numpy(), points_table["y"].to_numpy()
+        else:
+            with open(points_json_path, "r", encoding="utf-8") as f:
+                points_data = json.load(f)
+
+            features = points_data["features"]
+            coords = np.array([feature["geometry"]["coordinates"][:2] for feature in features], dtype=float).reshape(-1, 2)
+            x, y = coords[:, 0], coords[:, 1]
+        read.add(accepted=len(x))
+
+    # Test every point in one pass
+    inside = points_inside_boundaries(x, y, boundary_geoms)
+
+    with stage("write", accepted=int(np.count_nonzero(inside))) as write:
+        if is_columnar_path(points_json_path):
+            filtered_table = points_table[inside]
+            if is_columnar_path(output_json_path):
+                write_plant_table(output_json_path, filtered_table, crs=points_crs)
+            else:
+                filtered_features = list(table_to_features(filtered_table))
+        else:
+            filtered_features = [feature for feature, keep in zip(features, inside) if keep]
+            if is_columnar_path(output_json_path):
+                write_plant_table(output_json_path, features_to_table(filtered_features), crs="EPSG:4326")
+
+        if not is_columnar_path(output_json_path):
+            # Save the filtered points to a new GeoJSON file
+            write_features(output_json_path, filtered_features, indent=indent, precision=precision, compact=compact)
+        write.add(bytes_written=os.path.getsize(output_json_path))
 
     print(f"Filtered points saved to {output_json_path}")
+    report("filter_points_outside_boundary")
 
 if __name__ == "__main__":
 
@@ -190,8 +396,7 @@ if __name__ == "__main__":
 
     result = generate_parallel_rows(boundary_json)
 
-    with open(final_generated_path, "w") as f:
-        json.dump(result, f, indent=4)
+    write_features(final_generated_path, result["features"], indent=4)
 
     print(f"GeoJSON file saved as {final_generated_path}")
 
@@ -0,0 +1,348 @@
+"""
+Streaming GeoJSON reader and writer.
+
+FeatureReader walks a FeatureCollection and yields one feature at a time, so
+only the current feature (plus a read buffer) is held in memory.
+FeatureWriter writes the collection header, then each feature as it comes,
+into a temporary file that replaces the output on close. Reading and writing
+the same path is therefore safe.
+
+FeatureWriter can also write compact files (no whitespace at all, encoded
+with orjson when it is installed) and round coordinates to a fixed number of
+decimals, which makes large plant files several times smaller and faster to
+write.
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 1 << 20
+
+# Decimals kept for longitude/latitude: 1e-8 degree is about 1 mm on the ground
+WGS84_PRECISION = 8
+# Decimals kept for projected (metre or foot) coordinates
+PROJECTED_PRECISION = 3
+
+_COMPACT_SEPARATORS = (",", ":")
+
+_WHITESPACE = " \t\n\r"
+
+
+class FeatureReader:
+    """
+    Iterate over the features of a GeoJSON FeatureCollection without loading the file.
+
+    Top-level members found before "features" (type, name, crs, ...) are in
+    `header` as soon as the reader is opened; members written after the
+    features array are added once iteration finishes.
+
+    Example:
+        with FeatureReader("plants.geojson") as reader:
+            crs = reader.header.get("crs")
+            for feature in reader:
+                ...
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.header = {}
+        self._file = None
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+        self._in_features = False
+
+        # Byte offset of buffer index _mark_char, advanced lazily by _byte_offset
+        self._mark_char = 0
+        self._mark_byte = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def open(self):
+        if self._file is None:
+            with open(self.path, "rb") as f:
+                self._mark_byte = 3 if f.read(3) == b"\xef\xbb\xbf" else 0
+
+            # newline="" keeps \r\n as is, so character and byte offsets line up
+            self._file = open(self.path, "r", encoding="utf-8-sig", newline="")
+            self._expect("{")
+            self._read_members()
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __iter__(self):
+        for _, _, feature in self.iter_spans():
+            yield feature
+
+    def iter_spans(self):
+        """Yield (start byte, end byte, feature) for every feature, in file order."""
+        self.open()
+        first = True
+        while self._in_features:
+            self._skip_whitespace()
+            if self._peek() == "]":
+                self._pos += 1
+                self._in_features = False
+                self._read_members(after_features=True)
+                break
+            if not first:
+                self._expect(",")
+            self._skip_whitespace()
+            start = self._byte_offset(self._pos)
+            feature = self._decode_value()
+            yield start, self._byte_offset(self._pos), feature
+            first = False
+
+    # -- low level parsing -------------------------------------------------
+
+    def _fill(self):
+        """Read the next chunk; returns False at end of file."""
+        if self._eof:
+            return False
+        chunk = self._file.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+
+        # Drop what has already been consumed so memory stays bounded
+        self._byte_offset(self._pos)
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        self._mark_char = 0
+        return True
+
+    def _byte_offset(self, char_index):
+        """File byte offset of a buffer index at or after the last one asked for."""
+        self._mark_byte += len(self._buffer[self._mark_char:char_index].encode("utf-8"))
+        self._mark_char = char_index
+        return self._mark_byte
+
+    def _skip_whitespace(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return
+
+    def _peek(self):
+        self._skip_whitespace()
+        if self._pos >= len(self._buffer):
+            raise ValueError(f"Unexpected end of GeoJSON file: {self.path}")
+        return self._buffer[self._pos]
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self._pos} of {self.path}")
+        self._pos += 1
+
+    def _decode_value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+
+            # A number may be cut at the chunk boundary; make sure it is complete
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _read_members(self, after_features=False):
+        """Read top-level members until the features array starts or the object ends."""
+        first = not after_features
+        while True:
+            if self._peek() == "}":
+                self._pos += 1
+                return
+            if not first:
+                self._expect(",")
+            first = False
+
+            key = self._decode_value()
+            self._expect(":")
+            if key == "features" and not after_features:
+                self._expect("[")
+                self._in_features = True
+                return
+            self.header[key] = self._decode_value()
+
+
+def iter_features(path):
+    """Yield the features of a GeoJSON file one at a time."""
+    with FeatureReader(path) as reader:
+        yield from reader
+
+
+def read_feature_at(path, start, end):
+    """Decode the single feature stored at bytes [start, end) of a GeoJSON file."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        return json.loads(f.read(end - start))
+
+
+def read_header(path):
+    """Return the top-level members (type, name, crs, ...) written before the features."""
+    with FeatureReader(path) as reader:
+        return dict(reader.header)
+
+
+def round_coordinates(coordinates, precision):
+    """Round a (nested) GeoJSON coordinate array to `precision` decimals."""
+    if len(coordinates) and isinstance(coordinates[0], (list, tuple)):
+        return [round_coordinates(part, precision) for part in coordinates]
+    return [round(value, precision) for value in coordinates]
+
+
+def round_geometry(geometry, precision):
+    """Copy of a GeoJSON geometry with its coordinates rounded to `precision` decimals."""
+    if geometry is None:
+        return None
+    if geometry.get("type") == "GeometryCollection":
+        return dict(geometry, geometries=[round_geometry(part, precision) for part in geometry["geometries"]])
+    return dict(geometry, coordinates=round_coordinates(geometry["coordinates"], precision))
+
+
+def _compact_dumps(value):
+    """JSON text without whitespace; orjson when installed, json otherwise."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:
+            # Values orjson refuses (non-string keys, integers over 64 bits, ...)
+            pass
+    return json.dumps(value, separators=_COMPACT_SEPARATORS)
+
+
+class FeatureWriter:
+    """
+    Write a GeoJSON FeatureCollection one feature at a time.
+
+    The output has the same layout json.dump produces for the equivalent
+    dictionary ({"type", <header members>, "features"}). With compact=True
+    it has no whitespace at all (indent is ignored). With precision set,
+    feature coordinates are rounded to that many decimals; the features
+    passed in are not modified.
+
+    Example:
+        with FeatureWriter("out.geojson", header={"name": "plants", "crs": crs}, indent=4) as writer:
+            for feature in features:
+                writer.write(feature)
+
+        with FeatureWriter("out.geojson", header=header, compact=True, precision=WGS84_PRECISION) as writer:
+            writer.write_many(features)
+    """
+
+    def __init__(self, path, header=None, indent=None, precision=None, compact=False):
+        self.path = path
+        self.header = dict(header or {})
+        self.indent = None if compact else indent
+        self.precision = precision
+        self.compact = compact
+        self.count = 0
+        self.bytes_written = 0
+        self._tmp_path = f"{path}.tmp"
+        self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _dumps(self, value, level):
+        if self.compact:
+            return _compact_dumps(value)
+        text = json.dumps(value, indent=self.indent)
+        if self.indent is None or level == 0:
+            return text
+        return text.replace("\n", "\n" + " " * (self.indent * level))
+
+    def open(self):
+        if self._file is not None:
+            return self
+        self._file = open(self._tmp_path, "w", encoding="utf-8")
+
+        members = {"type": "FeatureCollection"}
+        members.update({key: value for key, value in self.header.items() if key not in ("type", "features")})
+
+        if self.compact:
+            parts = [f"{json.dumps(key)}:{self._dumps(value, 1)}" for key, value in members.items()]
+            self._file.write("{" + ",".join(parts) + ',"features":[')
+        elif self.indent is None:
+            parts = [f"{json.dumps(key)}: {self._dumps(value, 1)}" for key, value in members.items()]
+            self._file.write("{" + ", ".join(parts) + ', "features": [')
+        else:
+            pad = " " * self.indent
+            parts = [f"{pad}{json.dumps(key)}: {self._dumps(value, 1)}" for key, value in members.items()]
+            self._file.write("{\n" + ",\n".join(parts) + f',\n{pad}"features": [')
+        return self
+
+    def write(self, feature):
+        if self._file is None:
+            self.open()
+        if self.precision is not None and feature.get("geometry") is not None:
+            feature = dict(feature, geometry=round_geometry(feature["geometry"], self.precision))
+        separator = "," if self.count else ""
+        if self.compact:
+            self._file.write(separator + self._dumps(feature, 0))
+        elif self.indent is None:
+            self._file.write(separator + (" " if self.count else "") + self._dumps(feature, 0))
+        else:
+            pad = " " * (self.indent * 2)
+            self._file.write(f"{separator}\n{pad}{self._dumps(feature, 2)}")
+        self.count += 1
+
+    def write_many(self, features):
+        for feature in features:
+            self.write(feature)
+
+    def close(self):
+        if self._file is None:
+            return
+        if self.indent is None:
+            self._file.write("]}")
+        elif self.count == 0:
+            self._file.write("]\n}")
+        else:
+            self._file.write("\n" + " " * self.indent + "]\n}")
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.path)
+        self.bytes_written = os.path.getsize(self.path)
+
+    def abort(self):
+        """Discard a partially written output."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self._tmp_path)
+
+
+def write_features(path, features, header=None, indent=None, precision=None, compact=False):
+    """Stream an iterable of features to a GeoJSON file; returns the number written."""
+    with FeatureWriter(path, header=header, indent=indent, precision=precision, compact=compact) as writer:
+        writer.write_many(features)
+    return writer.count
@@ -46,24 +46,126 @@
 
 
 
-import pandas as pd
-import geopandas as gpd
-from shapely.geometry import Point
-
-# Load CSV file
-df = pd.read_csv("E:/plant_point_generate_using_boundary_json/mayacamas/Mayacamas GPS Points.csv")
-
-# Drop rows where coordinates are missing
-df = df.dropna(subset=["Latitude", "Longitude"])
+import os
 
-# Create geometry column
-geometry = [Point(xy) for xy in zip(df["Longitude"], df["Latitude"])]
-
-# Convert to GeoDataFrame
-gdf = gpd.GeoDataFrame(df, geometry=geometry)
-
-# Set CRS (assuming WGS84 - EPSG:4326)
-gdf.set_crs(epsg=4326, inplace=True)
+import numpy as np
+import pandas as pd
 
-# Save to GeoJSON
-gdf.to_file("E:/plant_point_generate_using_boundary_json/mayacamas/Mayacamas_Groun_control_Points.geojson", driver="GeoJSON")
+from geojson_stream import FeatureWriter
+from instrumentation import report, stage
+from plant_store import table_to_features
+
+# How the GeoJSON driver labels EPSG:4326 (longitude, latitude order)
+WGS84_CRS = {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}}
+
+# Rows parsed per chunk; memory is bounded by one chunk, not by the file size
+CHUNK_SIZE = 100_000
+
+def column_types(csv_file, lat_col, lon_col, chunksize=CHUNK_SIZE, dtype=None):
+    """
+    Check the CSV header and fix the type of every column once for the whole file.
+
+    pandas infers types chunk by chunk, so a column could be numbers in one
+    chunk and text in the next. A first pass (without the coordinate columns)
+    records the types inferred for each chunk: a column keeps its type when all
+    chunks agree, integers mixed with decimals or missing values become float,
+    and any other mix is read as text. dtype (column -> type) overrides the result.
+    """
+    columns = pd.read_csv(csv_file, nrows=0).columns
+    missing = [column for column in (lat_col, lon_col) if column not in columns]
+    if missing:
+        raise ValueError(f"{csv_file} has no {' or '.join(missing)} column (columns: {', '.join(columns)})")
+
+    inferred = {}
+    other_columns = [column for column in columns if column not in (lat_col, lon_col)]
+    if other_columns:
+        for chunk in pd.read_csv(csv_file, chunksize=chunksize, usecols=other_columns):
+            for column, kind in chunk.dtypes.items():
+                inferred.setdefault(column, set()).add(kind)
+
+    types = {}
+    for column, kinds in inferred.items():
+        if len(kinds) == 1:
+            types[column] = kinds.pop()
+        elif all(pd.api.types.is_numeric_dtype(kind) and not pd.api.types.is_bool_dtype(kind) for kind in kinds):
+            types[column] = np.float64
+        else:
+            types[column] = str
+    types.update(dtype or {})
+    return types
+
+def valid_coordinates(latitude, longitude):
+    """Parse latitude/longitude columns; returns (lat, lon, mask of usable rows)."""
+    latitude = pd.to_numeric(latitude, errors="coerce")
+    longitude = pd.to_numeric(longitude, errors="coerce")
+    valid = latitude.between(-90, 90) & longitude.between(-180, 180)
+    return latitude, longitude, valid.to_numpy()
+
+def csv_to_geojson(csv_file, geojson_file, lat_col="Latitude", lon_col="Longitude",
+                   chunksize=CHUNK_SIZE, bad_rows_file=None, indent=None, precision=None, compact=False, dtype=None):
+    """
+    Converts a GPS survey CSV to a WGS84 point GeoJSON file, one chunk at a time.
+
+    Coordinates are parsed for a whole chunk at once; rows with a missing,
+    non-numeric or out-of-range latitude/longitude are skipped and reported
+    together at the end. Every CSV column is kept as a property.
+
+    :param csv_file: Path to the input CSV file.
+    :param geojson_file: Path to the output GeoJSON file.
+    :param lat_col: Name of the latitude column in CSV.
+    :param lon_col: Name of the longitude column in CSV.
+    :param chunksize: Number of CSV rows parsed at once.
+    :param bad_rows_file: Optional CSV receiving the skipped rows, with their line number.
+    :param precision: Round the point coordinates to this many decimals (the
+        latitude/longitude properties keep the surveyed values).
+    :param compact: Write without whitespace (indent is ignored).
+    :param dtype: Column types overriding the ones found by column_types.
+    :return: (number of points written, number of rows skipped)
+    """
+    types = column_types(csv_file, lat_col, lon_col, chunksize, dtype)
+    if bad_rows_file is not None and os.path.exists(bad_rows_file):
+        # Rows skipped by an earlier run must not be mistaken for this run's
+        os.remove(bad_rows_file)
+    header = {"name": os.path.splitext(os.path.basename(geojson_file))[0], "crs": WGS84_CRS}
+    skipped, bad_lines = 0, []
+
+    parse, write = stage("parse"), stage("write")
+    with FeatureWriter(geojson_file, header=header, indent=indent, compact=compact) as writer:
+        for chunk in pd.read_csv(csv_file, chunksize=chunksize, dtype=types):
+            with parse:
+                latitude, longitude, valid = valid_coordinates(chunk[lat_col], chunk[lon_col])
+                parse.add(candidates=len(chunk), accepted=np.count_nonzero(valid))
+
+            if not valid.all():
+                bad = chunk[~valid]
+                skipped += len(bad)
+                # Line 1 of the CSV is the header
+                bad_lines.extend((bad.index + 2).tolist()[:10 - len(bad_lines)])
+                if bad_rows_file is not None:
+                    bad.insert(0, "line", bad.index + 2)
+                    bad.to_csv(bad_rows_file, mode="w" if skipped == len(bad) else "a",
+                               header=skipped == len(bad), index=False)
+
+            # Keep the parsed coordinates; other missing values become JSON null
+            good = chunk[valid]
+            table = good.astype(object).where(good.notna(), None)
+            table[lat_col] = latitude[valid]
+            table[lon_col] = longitude[valid]
+            table["x"] = longitude[valid].to_numpy()
+            table["y"] = latitude[valid].to_numpy()
+            if precision is not None:
+                table["x"], table["y"] = table["x"].round(precision), table["y"].round(precision)
+            with write:
+                writer.write_many(table_to_features(table))
+
+    write.add(accepted=writer.count, bytes_written=writer.bytes_written)
+    if skipped:
+        more = ", ..." if skipped > len(bad_lines) else ""
+        print(f"Skipped {skipped} rows with invalid coordinates (lines {', '.join(map(str, bad_lines))}{more})")
+    print(f"Saved {writer.count} points to {geojson_file}")
+    report("csv_to_geojson")
+    return writer.count, skipped
+
+if __name__ == "__main__":
+    csv_to_geojson("E:/plant_point_generate_using_boundary_json/mayacamas/Mayacamas GPS Points.csv",
+                   "E:/plant_point_generate_using_boundary_json/mayacamas/Mayacamas_Groun_control_Points.geojson")
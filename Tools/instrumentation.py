@@ -0,0 +1,193 @@
+"""
+Per-stage timing and counters.
+
+Wrap each step of a script in a stage to record its wall time and, when
+known, how many candidates it looked at, how many it accepted and how many
+bytes it wrote:
+
+    with stage("containment", block="F10") as s:
+        inside = shapely.contains_xy(block_geom, x, y)
+        s.add(candidates=len(x), accepted=int(inside.sum()))
+    ...
+    report("plant_generation")
+
+Instrumentation is off unless the PLANT_INSTRUMENT environment variable is
+set. "1" prints the report. A path ending in .json or .jsonl also appends the
+report to that file as one JSON line. When instrumentation is off, stage()
+returns a shared do-nothing object and report() returns None, so
+instrumented code pays only for a function call.
+"""
+import json
+import os
+import time
+
+ENV_VAR = "PLANT_INSTRUMENT"
+
+_enabled = False
+_report_path = None
+_records = []
+
+
+class Stage:
+    """
+    One timed stage; counters left as None were not measured.
+
+    A stage may be entered several times (once per chunk, say): the times
+    add up and it is recorded once.
+    """
+
+    __slots__ = ("name", "block", "seconds", "candidates", "accepted", "bytes_written", "_start", "_recorded")
+
+    def __init__(self, name, block=None, candidates=None, accepted=None, bytes_written=None):
+        self.name = name
+        self.block = block
+        self.seconds = 0.0
+        self.candidates = candidates
+        self.accepted = accepted
+        self.bytes_written = bytes_written
+        self._start = None
+        self._recorded = False
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds += time.perf_counter() - self._start
+        if not self._recorded:
+            self._recorded = True
+            _records.append(self)
+        return False
+
+    def add(self, candidates=0, accepted=0, bytes_written=0):
+        """Add to the counters of this stage (for counts gathered chunk by chunk)."""
+        if candidates:
+            self.candidates = (self.candidates or 0) + int(candidates)
+        if accepted:
+            self.accepted = (self.accepted or 0) + int(accepted)
+        if bytes_written:
+            self.bytes_written = (self.bytes_written or 0) + int(bytes_written)
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "block": self.block,
+            "seconds": self.seconds,
+            "candidates": self.candidates,
+            "accepted": self.accepted,
+            "bytes_written": self.bytes_written,
+        }
+
+
+class _NullStage:
+    """Stand-in returned while instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def add(self, candidates=0, accepted=0, bytes_written=0):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def enable(report_path=None):
+    """Turn instrumentation on; report() also appends to report_path when given."""
+    global _enabled, _report_path
+    _enabled = True
+    _report_path = report_path
+
+
+def disable():
+    global _enabled, _report_path
+    _enabled = False
+    _report_path = None
+
+
+def enabled():
+    return _enabled
+
+
+def stage(name, block=None, candidates=None, accepted=None, bytes_written=None):
+    """Context manager timing one stage (of one block); a no-op while disabled."""
+    if not _enabled:
+        return _NULL_STAGE
+    return Stage(name, block, candidates, accepted, bytes_written)
+
+
+def drain():
+    """Remove and return the records collected so far (as dicts), e.g. to send them from a worker process."""
+    records = [record.as_dict() for record in _records]
+    _records.clear()
+    return records
+
+
+def extend(records):
+    """Add records drained in another process."""
+    if not _enabled:
+        return
+    for record in records:
+        restored = Stage(record["stage"], record["block"], record["candidates"],
+                         record["accepted"], record["bytes_written"])
+        restored.seconds = record["seconds"]
+        restored._recorded = True
+        _records.append(restored)
+
+
+def summarize(records):
+    """Totals per stage name, in the order the stages first ran."""
+    totals = {}
+    for record in records:
+        total = totals.setdefault(record["stage"], {
+            "stage": record["stage"], "calls": 0, "seconds": 0.0,
+            "candidates": None, "accepted": None, "bytes_written": None,
+        })
+        total["calls"] += 1
+        total["seconds"] += record["seconds"]
+        for key in ("candidates", "accepted", "bytes_written"):
+            if record[key] is not None:
+                total[key] = (total[key] or 0) + record[key]
+    return list(totals.values())
+
+
+def report(title):
+    """
+    Print (and optionally append to the report file) the stages recorded since
+    the last report, then clear them. Returns the report dict, or None when
+    instrumentation is disabled.
+    """
+    if not _enabled:
+        return None
+
+    records = drain()
+    result = {"title": title, "stages": summarize(records), "records": records}
+
+    print(f"[{title}] stage timings")
+    for total in result["stages"]:
+        counters = "".join(
+            f"  {label} {total[key]}" for key, label in
+            (("candidates", "candidates"), ("accepted", "accepted"), ("bytes_written", "bytes"))
+            if total[key] is not None
+        )
+        print(f"  {total['stage']:<20s} {total['seconds']:9.3f} s  x{total['calls']}{counters}")
+
+    if _report_path:
+        with open(_report_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, default=str) + "\n")
+    return result
+
+
+def _configure_from_environment():
+    value = os.environ.get(ENV_VAR, "").strip()
+    if value.lower() in ("", "0", "false", "no", "off"):
+        return
+    enable(value if value.lower().endswith((".json", ".jsonl")) else None)
+
+
+_configure_from_environment()
@@ -1,51 +1,114 @@
+import os
+
 import geopandas as gpd
-from shapely.geometry import LineString
-import json
+import numpy as np
+import pandas as pd
+import shapely
 
-def generate_points_with_spacing(input_geojson_path, output_geojson_path, spacing_feet=5):
-    # Load GeoJSON (in EPSG:4326)
-    gdf = gpd.read_file(input_geojson_path)
+from geojson_stream import write_features
+from instrumentation import report, stage
+from plant_store import is_columnar_path, table_to_features, write_plant_table
 
-    # Reproject to a CRS that uses feet (NAD83 / California zone III (ftUS))
-    gdf = gdf.to_crs(epsg=2227)
+# How the GeoJSON driver labels EPSG:4326 (longitude, latitude order)
+WGS84_CRS = {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}}
+
+def as_linestrings(geometries):
+    """
+    Return the geometries as an array of LineStrings.
+
+    MultiLineStrings are flattened into one LineString through all their
+    vertices; anything that is not a line becomes None.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    lines = np.full(len(geometries), None, dtype=object)
+
+    type_ids = shapely.get_type_id(geometries)
+    is_line = type_ids == shapely.GeometryType.LINESTRING
+    lines[is_line] = geometries[is_line]
+
+    is_multi = type_ids == shapely.GeometryType.MULTILINESTRING
+    if is_multi.any():
+        coords, index = shapely.get_coordinates(geometries[is_multi], return_index=True)
+        lines[is_multi] = shapely.linestrings(coords, indices=index)
+    return lines
 
-    points = []
+def points_along_lines(lines, spacing):
+    """
+    Interpolate points every `spacing` along every line in a single
+    shapely.line_interpolate_point call.
 
-    for _, row in gdf.iterrows():
-        row_id = row.get('row_id')
-        line_geom = row.geometry
+    Returns (line index, plant_id, point geometries) arrays; plant_id starts at 1 on each line.
+    """
+    counts = (shapely.length(lines) // spacing).astype(np.int64) + 1
+    line_index = np.repeat(np.arange(len(lines)), counts)
+    plant_index = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
 
-        # Flatten MultiLineString if needed
-        if line_geom.geom_type == 'MultiLineString':
-            line_geom = LineString([pt for part in line_geom.geoms for pt in part.coords])
-        elif line_geom.geom_type != 'LineString':
-            continue
+    points = shapely.line_interpolate_point(lines[line_index], plant_index * spacing)
+    return line_index, plant_index + 1, points
 
-        total_length = line_geom.length
-        num_points = int(total_length // spacing_feet) + 1
-        distances = [i * spacing_feet for i in range(num_points)]
+def generate_points_with_spacing(input_geojson_path, output_geojson_path, spacing_feet=5, indent=None,
+                                 precision=None, compact=False):
+    """
+    Place a point every spacing_feet along every row line and write them
+    (in EPSG:4326) to GeoJSON or a columnar plant file. precision rounds the
+    written coordinates to that many decimals; compact writes GeoJSON without
+    whitespace.
+    """
+    # Load GeoJSON (in EPSG:4326)
+    with stage("read") as read:
+        gdf = gpd.read_file(input_geojson_path)
+        read.add(accepted=len(gdf))
+
+    # Reproject to a CRS that uses feet (NAD83 / California zone III (ftUS))
+    with stage("reproject", candidates=len(gdf)):
+        gdf = gdf.to_crs(epsg=2227)
+
+    # Flatten MultiLineStrings and skip anything that is not a line
+    lines = as_linestrings(gdf.geometry.values)
+    keep = pd.notna(lines)
+    row_ids = gdf['row_id'].to_numpy()[keep] if 'row_id' in gdf.columns else np.full(keep.sum(), None)
 
-        for i, dist in enumerate(distances):
-            point = line_geom.interpolate(dist)
-            points.append({
-                "geometry": point,
-                "row_id": row_id,
-                "plant_id": i + 1
-            })
+    # All (row, distance) pairs at once
+    with stage("interpolate", candidates=int(keep.sum())) as interpolate:
+        line_index, plant_ids, points = points_along_lines(lines[keep], spacing_feet)
+        interpolate.add(accepted=len(points))
 
     # Create GeoDataFrame from points
-    points_gdf = gpd.GeoDataFrame(points, geometry="geometry", crs="EPSG:2227")
+    points_gdf = gpd.GeoDataFrame(
+        {"row_id": row_ids[line_index], "plant_id": plant_ids},
+        geometry=points, crs="EPSG:2227"
+    )
 
     # Reproject back to WGS84 for GeoJSON export
-    points_gdf = points_gdf.to_crs(epsg=4326)
+    with stage("reproject_points", candidates=len(points_gdf)):
+        points_gdf = points_gdf.to_crs(epsg=4326)
 
-    # Export to GeoJSON
-    points_gdf.to_file(output_geojson_path, driver="GeoJSON")
+    # Export to GeoJSON, or to a columnar plant file (.parquet / .arrow)
+    with stage("write", accepted=len(points_gdf)) as write:
+        table = points_table(points_gdf, precision)
+        if is_columnar_path(output_geojson_path):
+            write_plant_table(output_geojson_path, table, crs="EPSG:4326")
+        else:
+            header = {"name": os.path.splitext(os.path.basename(output_geojson_path))[0], "crs": WGS84_CRS}
+            write_features(output_geojson_path, table_to_features(table), header=header, indent=indent,
+                           compact=compact)
+        write.add(bytes_written=os.path.getsize(output_geojson_path))
     print(f"Output saved to {output_geojson_path}")
+    report("generate_points_with_spacing")
 
+def points_table(points_gdf, precision=None):
+    """Flatten a point GeoDataFrame into a plant table with x/y columns, optionally rounded to `precision` decimals."""
+    table = pd.DataFrame(points_gdf.drop(columns="geometry"))
+    table["x"] = points_gdf.geometry.x.to_numpy()
+    table["y"] = points_gdf.geometry.y.to_numpy()
+    if precision is not None:
+        table["x"], table["y"] = table["x"].round(precision), table["y"].round(precision)
+    return table
 
 
-generate_points_with_spacing(
-    "E:/plant_point_generate_using_boundary_json/curved_row/curved_row.geojson", 
-    "E:/plant_point_generate_using_boundary_json/curved_row/curved_row_points_v1.geojson"
-    )
+
+if __name__ == "__main__":
+    generate_points_with_spacing(
+        "E:/plant_point_generate_using_boundary_json/curved_row/curved_row.geojson", 
+        "E:/plant_point_generate_using_boundary_json/curved_row/curved_row_points_v1.geojson"
+        )
@@ -1,43 +1,150 @@
-import json
+import argparse
+from pathlib import Path
+
+import pyproj
+
+from geojson_stream import FeatureWriter, iter_features, read_header
+from instrumentation import report, stage
+
+DEFAULT_KEY_FIELDS = ("block_id", "row_id", "plant_id")
+
+def crs_name(crs):
+    """Name of a GeoJSON crs member (e.g. "urn:ogc:def:crs:EPSG::32610"), or None."""
+    if not crs:
+        return None
+    return (crs.get("properties") or {}).get("name")
+
+def parse_crs(crs):
+    """pyproj CRS of a GeoJSON crs member; a missing member means CRS84, the GeoJSON default."""
+    return pyproj.CRS.from_user_input(crs_name(crs) or "OGC:CRS84")
+
+def list_geojson_files(inputs, output_file=None):
+    """Expand folders to the *.geojson files they contain (sorted), leaving files as given."""
+    output_file = Path(output_file).resolve() if output_file is not None else None
+    paths = []
+    for path in map(Path, inputs):
+        if path.is_dir():
+            # A folder may also hold the output of a previous merge
+            paths.extend(found for found in sorted(path.glob("*.geojson")) if found.resolve() != output_file)
+        else:
+            paths.append(path)
+    return [str(path) for path in paths]
+
+def check_crs(paths):
+    """
+    Return the crs member shared by all the files (None when none of them has
+    one); raises ValueError when they disagree.
+
+    CRSs are compared by pyproj, so two names of the same CRS match; axis order
+    is ignored because GeoJSON coordinates are always (x, y) / (lon, lat). A
+    file without a crs member is CRS84.
+    """
+    crs, reference, reference_file = None, None, None
+    for path in paths:
+        file_crs = read_header(path).get("crs")
+        parsed = parse_crs(file_crs)
+        if reference is None:
+            reference, reference_file = parsed, path
+        elif not parsed.equals(reference, ignore_axis_order=True):
+            raise ValueError(f"CRS mismatch: {path} is {crs_name(file_crs) or 'CRS84 (no crs member)'}, "
+                             f"{reference_file} is {reference.to_string()}")
+        if crs is None and crs_name(file_crs) is not None:
+            crs = file_crs
+    return crs
+
+def unique_features(features, key_fields=DEFAULT_KEY_FIELDS, stats=None):
+    """
+    Yield the features whose (block, row, plant) key has not been seen yet.
+
+    Only the keys are kept in memory. Features missing one of the key
+    properties are always kept.
+    """
+    seen = set()
+    for feature in features:
+        properties = feature.get("properties") or {}
+        key = tuple(properties.get(field) for field in key_fields)
+        if None not in key:
+            if key in seen:
+                if stats is not None:
+                    stats["duplicates"] += 1
+                continue
+            seen.add(key)
+        yield feature
+
+def merge_geojson_files(inputs, output_file, name="plants", dedupe=False, key_fields=DEFAULT_KEY_FIELDS, indent=4,
+                        precision=None, compact=False):
+    """
+    Streams any number of GeoJSON files (or folders of them) into one file.
+
+    Features are written as they are read, so memory does not grow with the
+    size of the inputs; with dedupe only the (block, row, plant) keys are kept.
+    output_file may be one of the inputs.
+
+    Parameters:
+    inputs (list): GeoJSON files and/or folders, merged in the given order.
+    output_file (str): Path to save the merged GeoJSON file.
+    name (str): Name of the merged collection.
+    dedupe (bool): Drop features whose key was already written (first one wins).
+    key_fields (tuple): Properties forming the plant key used by dedupe.
+    precision (int): Round coordinates to this many decimals (None keeps them as read).
+    compact (bool): Write without any whitespace (indent is ignored).
+    """
+    paths = list_geojson_files(inputs, output_file)
+    if not paths:
+        raise ValueError("No GeoJSON files to merge")
+
+    header = {"name": name, "crs": check_crs(paths) or {}}
+    stats = {"duplicates": 0}
+
+    def features():
+        for path in paths:
+            yield from iter_features(path)
+
+    merged = unique_features(features(), key_fields, stats) if dedupe else features()
+    with stage("merge_write") as write:
+        with FeatureWriter(output_file, header=header, indent=indent, precision=precision, compact=compact) as writer:
+            writer.write_many(merged)
+        write.add(candidates=writer.count + stats["duplicates"], accepted=writer.count,
+                  bytes_written=writer.bytes_written)
+
+    print(f"Merged {len(paths)} files ({writer.count} features, {stats['duplicates']} duplicates dropped) into {output_file}")
+    report("merge_geojson_files")
+    return writer.count
 
 def merge_geojson(file1, file2, output_file):
     """
     Merges two GeoJSON files into one.
+
+    Features are streamed from both inputs into the output, so neither file
+    is loaded into memory. output_file may be one of the inputs.
     
     Parameters:
     file1 (str): Path to the first GeoJSON file.
     file2 (str): Path to the second GeoJSON file.
     output_file (str): Path to save the merged GeoJSON file.
     """
-    # Load the first GeoJSON file
-    with open(file1, 'r', encoding='utf-8') as f:
-        geojson1 = json.load(f)
-    
-    # Load the second GeoJSON file
-    with open(file2, 'r', encoding='utf-8') as f:
-        geojson2 = json.load(f)
-    
-    # Merge features
-    merged_features = geojson1["features"] + geojson2["features"]
-    
-    # Create merged GeoJSON structure
-    merged_geojson = {
-        "type": "FeatureCollection",
-        "name": "plants",
-        "crs": geojson1.get("crs", {}),
-        "features": merged_features
-    }
-    
-    # Save the merged GeoJSON file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(merged_geojson, f, indent=4)
-    
-    print(f"Merged GeoJSON saved as {output_file}")
-
-# Example usage
-merge_geojson("E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/Bettinelli_plant_points_KD_v1_filtered.geojson",
-               "E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/F10_block_plants_KD.geojson", 
-               "E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/Bettinelli_plant_points_KD_v1_filtered.geojson")
+    return merge_geojson_files([file1, file2], output_file)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge GeoJSON plant files into one file.")
+    parser.add_argument("inputs", nargs="+", help="GeoJSON files or folders of *.geojson files, merged in order")
+    parser.add_argument("-o", "--output", required=True, help="Merged GeoJSON file (may be one of the inputs)")
+    parser.add_argument("--name", default="plants", help="Name of the merged collection")
+    parser.add_argument("--dedupe", action="store_true", help="Drop duplicate (block_id, row_id, plant_id) features")
+    parser.add_argument("--key", nargs=3, default=list(DEFAULT_KEY_FIELDS), metavar=("BLOCK", "ROW", "PLANT"),
+                        help="Properties forming the plant key used by --dedupe")
+    parser.add_argument("--precision", type=int, default=None, help="Round coordinates to this many decimals")
+    parser.add_argument("--compact", action="store_true", help="Write the output without whitespace")
+    args = parser.parse_args(argv)
+
+    merge_geojson_files(args.inputs, args.output, name=args.name, dedupe=args.dedupe, key_fields=tuple(args.key),
+                        precision=args.precision, compact=args.compact)
+
+if __name__ == "__main__":
+    # Example usage:
+    # python merge_two_final_files.py E:/plant_point_generate_using_boundary_json/final_mayacamas_files
+    #     -o E:/plant_point_generate_using_boundary_json/mayacamas/Mayacamas_original_plant_points.geojson --dedupe
+    main()
 
 
 
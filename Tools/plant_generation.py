@@ -10,9 +10,53 @@ from qgis.core import (
 )
 from PyQt5.QtCore import QVariant
 import math
+import sys
+
+# Folder holding plant_grid.py and the other Tools modules. The QGIS console
+# runs this script with exec(), which does not put the script's folder on sys.path
+tools_dir = 'E:/plant_point_generate_using_boundary_json/Tools'
+if tools_dir not in sys.path:
+    sys.path.insert(0, tools_dir)
+
+try:
+    from instrumentation import report, stage
+except ImportError:
+    # Stage timings are optional; without instrumentation.py they do nothing
+    class _NullStage:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def add(self, candidates=0, accepted=0, bytes_written=0):
+            pass
+
+    def stage(name, block=None, candidates=None, accepted=None, bytes_written=None):
+        return _NullStage()
+
+    def report(title):
+        return None
 
 # Load the block boundaries layer
 layer_name = 'Mayacamas_22d_boundary'
+
+# 'grid' uses the vectorized engine in plant_grid.py, 'scanline' intersects each
+# row with the block once, 'loop' tests one point at a time
+generation_mode = 'grid'
+
+# Optional .parquet / .arrow path to also save the vine points as a columnar plant file
+columnar_output_path = None
+
+# The vectorized modes need plant_grid.py (and shapely); without them use the loop
+if generation_mode in ('grid', 'scanline'):
+    try:
+        import shapely.wkb
+        from plant_grid import generate_block_plants
+    except ImportError as error:
+        print(f"Cannot use generation_mode = '{generation_mode}' ({error}), using 'loop'")
+        generation_mode = 'loop'
+
 blocks_layer = QgsProject.instance().mapLayersByName(layer_name)[0]
 
 # Reproject the block boundaries layer to EPSG:32610
@@ -30,13 +74,15 @@ if blocks_layer.crs() != target_crs:
     
     # Transform features
     reprojected_features = []
-    for feature in blocks_layer.getFeatures():
-        geom = feature.geometry()
-        geom.transform(transformer)  # Reproject geometry
-        new_feature = QgsFeature()
-        new_feature.setGeometry(geom)
-        new_feature.setAttributes(feature.attributes())  # Copy attributes
-        reprojected_features.append(new_feature)
+    with stage("reproject_blocks") as reproject:
+        for feature in blocks_layer.getFeatures():
+            geom = feature.geometry()
+            geom.transform(transformer)  # Reproject geometry
+            new_feature = QgsFeature()
+            new_feature.setGeometry(geom)
+            new_feature.setAttributes(feature.attributes())  # Copy attributes
+            reprojected_features.append(new_feature)
+        reproject.add(accepted=len(reprojected_features))
     
     # Add reprojected features to the new layer
     reprojected_layer_provider.addFeatures(reprojected_features)
@@ -84,6 +130,27 @@ for block in blocks_layer.getFeatures():
     # Get the geometry of the block
     block_geom = block.geometry()
 
+    if generation_mode in ('grid', 'scanline'):
+        plants = generate_block_plants(
+            shapely.wkb.loads(bytes(block_geom.asWkb())),
+            block['vine_space'], block['row_space'], row_orientation,
+            block_name=block_name, block_id=block_id, method=generation_mode
+        )
+        with stage("add_features", block=block_name, accepted=len(plants)):
+            features = []
+            for row_id, plant_id, x_rot, y_rot in zip(
+                plants['row_id'].tolist(), plants['plant_id'].tolist(),
+                plants['x'].tolist(), plants['y'].tolist()
+            ):
+                feature = QgsFeature()
+                feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x_rot, y_rot)))
+                feature.setAttributes([block_name, block_id, row_id, plant_id])
+                features.append(feature)
+            output_layer_provider.addFeatures(features)
+
+        block_id += 1
+        continue
+
     # Calculate the block extent
     extent = block_geom.boundingBox()
     x_min, x_max = extent.xMinimum(), extent.xMaximum()
@@ -100,44 +167,64 @@ for block in blocks_layer.getFeatures():
     center = block_geom.centroid().asPoint()
     cx, cy = center.x(), center.y()
 
+    # Clip the grid to the block extent in the unrotated frame, keeping the
+    # buffered origin so the lattice positions stay the same
+    back_rotated = [rotate_point(v.x(), v.y(), cx, cy, -angle_rad) for v in block_geom.vertices()]
+    x_first = x_min + max(math.ceil((min(p[0] for p in back_rotated) - x_min) / plant_spacing), 0) * plant_spacing
+    y_first = y_min + max(math.ceil((min(p[1] for p in back_rotated) - y_min) / row_spacing), 0) * row_spacing
+    x_max = min(x_max, max(p[0] for p in back_rotated))
+    y_max = min(y_max, max(p[1] for p in back_rotated))
+
     # Reset row_id for the current block
     row_id = 1
 
-    # Generate a larger grid of points
-    y = y_min
-    while y <= y_max:
-        x = x_min
+    # Features of this block, committed with a single addFeatures call
+    block_features = []
 
-        # Reset plant_id for the current row
-        plant_id = 1
+    # Generate the grid of points
+    with stage("loop_containment", block=block_name) as loop_stage:
+        tested = 0
+        y = y_first
+        while y <= y_max:
+            x = x_first
 
-        # Increment row_id for rows with at least one point inside the block
-        row_has_points = False
+            # Reset plant_id for the current row
+            plant_id = 1
 
-        while x <= x_max:
-            # Rotate the point around the block center
-            x_rot, y_rot = rotate_point(x, y, cx, cy, angle_rad)
+            # Increment row_id for rows with at least one point inside the block
+            row_has_points = False
 
-            # Check if the rotated point lies within the block
-            point = QgsPointXY(x_rot, y_rot)
-            if block_geom.contains(QgsGeometry.fromPointXY(point)):
-                # Create a new feature for the point
-                feature = QgsFeature()
-                feature.setGeometry(QgsGeometry.fromPointXY(point))
-                feature.setAttributes([block_name, block_id, row_id, plant_id])
-                output_layer_provider.addFeature(feature)
+            while x <= x_max:
+                # Rotate the point around the block center
+                x_rot, y_rot = rotate_point(x, y, cx, cy, angle_rad)
 
-                # Increment plant_id only if a point is created
-                plant_id += 1
-                row_has_points = True
+                # Check if the rotated point lies within the block
+                point_geom = QgsGeometry.fromPointXY(QgsPointXY(x_rot, y_rot))
+                tested += 1
+                if block_geom.contains(point_geom):
+                    # Create a new feature for the point, reusing the tested geometry
+                    feature = QgsFeature()
+                    feature.setGeometry(point_geom)
+                    feature.setAttributes([block_name, block_id, row_id, plant_id])
+                    block_features.append(feature)
 
-            x += plant_spacing
+                    # Increment plant_id only if a point is created
+                    plant_id += 1
+                    row_has_points = True
 
-        # Increment row_id if the row contains any points
-        if row_has_points:
-            row_id += 1
+                x += plant_spacing
 
-        y += row_spacing
+            # Increment row_id if the row contains any points
+            if row_has_points:
+                row_id += 1
+
+            y += row_spacing
+
+        loop_stage.add(candidates=tested, accepted=len(block_features))
+
+    # Write straight to the provider (no edit buffer) in one call per block
+    with stage("add_features", block=block_name, accepted=len(block_features)):
+        output_layer_provider.addFeatures(block_features)
 
     # Increment block_id for the next block
     block_id += 1
@@ -145,7 +232,19 @@ for block in blocks_layer.getFeatures():
 # Add the output layer to the QGIS project
 QgsProject.instance().addMapLayer(output_layer)
 
+if columnar_output_path:
+    import pandas as pd
+    from plant_store import write_plant_table
+
+    records = []
+    for feature in output_layer.getFeatures():
+        point = feature.geometry().asPoint()
+        records.append(feature.attributes() + [point.x(), point.y()])
+    plant_table = pd.DataFrame(records, columns=['block_name', 'block_id', 'row_id', 'plant_id', 'x', 'y'])
+    write_plant_table(columnar_output_path, plant_table, crs='EPSG:32610')
+
 print("Vine points generation with row and plant numbering reset completed!")
+report("plant_generation")
 
 
 
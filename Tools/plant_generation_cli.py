@@ -0,0 +1,105 @@
+"""
+Headless plant generation.
+
+Does what plant_generation.py does inside QGIS, without starting QGIS:
+reads a block boundary file (GeoJSON, GeoPackage, Shapefile, ...), reprojects
+it to EPSG:32610 and writes the vine points with the same block_name,
+block_id, row_id and plant_id numbering.
+
+Example:
+    python plant_generation_cli.py Mayacamas_22d_boundary.geojson vine_points.geojson
+    python plant_generation_cli.py ranch.gpkg --layer blocks vine_points.arrow --method scanline --workers 0
+"""
+import argparse
+import os
+
+import geopandas as gpd
+
+from conversion import geojson_crs, transform_coordinates
+from geojson_stream import write_features
+from instrumentation import report, stage
+from plant_grid import generate_blocks
+from plant_store import is_columnar_path, table_to_features, write_plant_table
+
+WORKING_CRS = "EPSG:32610"
+
+
+def read_blocks(boundary_path, layer=None):
+    """Read the block boundaries and return one dict per block, in file order, in EPSG:32610."""
+    with stage("read") as read:
+        blocks_gdf = gpd.read_file(boundary_path, layer=layer)
+        read.add(accepted=len(blocks_gdf))
+    if blocks_gdf.crs is None:
+        raise ValueError(f"{boundary_path} has no CRS")
+    with stage("reproject_blocks", candidates=len(blocks_gdf)):
+        blocks_gdf = blocks_gdf.to_crs(WORKING_CRS)
+
+    blocks = []
+    for block_name, vine_space, row_space, row_orient, geometry in zip(
+        blocks_gdf["block_name"], blocks_gdf["vine_space"], blocks_gdf["row_space"],
+        blocks_gdf["row_orient"], blocks_gdf.geometry
+    ):
+        blocks.append({
+            "geometry": geometry,
+            "block_name": block_name,
+            "vine_space": float(vine_space),
+            "row_space": float(row_space),
+            "row_orient": float(row_orient),
+        })
+    return blocks
+
+
+def generate_plant_points(boundary_path, output_path, layer=None, method="grid", workers=None,
+                          output_crs=WORKING_CRS, indent=None, precision=None, compact=False):
+    """
+    Generate the vine points of every block in a boundary file and write them out.
+
+    The output format follows the extension: .parquet / .arrow write a columnar
+    plant file, anything else writes GeoJSON. precision rounds the written
+    coordinates to that many decimals; compact writes GeoJSON without
+    whitespace.
+    """
+    blocks = read_blocks(boundary_path, layer=layer)
+    plants = generate_blocks(blocks, method=method, workers=workers)
+
+    if output_crs != WORKING_CRS:
+        with stage("reproject", candidates=len(plants)):
+            plants["x"], plants["y"] = transform_coordinates(plants[["x", "y"]].to_numpy(), WORKING_CRS, output_crs)
+    if precision is not None:
+        # Rounded on the columns, so the writer does not have to round point by point
+        plants["x"], plants["y"] = plants["x"].round(precision), plants["y"].round(precision)
+
+    with stage("write", accepted=len(plants)) as write:
+        if is_columnar_path(output_path):
+            write_plant_table(output_path, plants, crs=output_crs)
+        else:
+            header = {"name": "vine_points", "crs": geojson_crs(output_crs)}
+            write_features(output_path, table_to_features(plants), header=header, indent=indent, compact=compact)
+        write.add(bytes_written=os.path.getsize(output_path))
+
+    print(f"Generated {len(plants)} vine points for {len(blocks)} blocks → {output_path}")
+    report("plant_generation_cli")
+    return plants
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate vine points from block boundaries without QGIS.")
+    parser.add_argument("boundary", help="Block boundary file with block_name, vine_space, row_space and row_orient fields")
+    parser.add_argument("output", help="Output file (.geojson, or .parquet / .arrow for a columnar plant file)")
+    parser.add_argument("--layer", help="Layer name when the boundary file has several layers")
+    parser.add_argument("--method", choices=["grid", "scanline"], default="grid", help="Generation method")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (0 = one per CPU)")
+    parser.add_argument("--output-crs", default=WORKING_CRS, help="CRS of the written points (default EPSG:32610)")
+    parser.add_argument("--indent", type=int, default=None, help="Indent GeoJSON output")
+    parser.add_argument("--precision", type=int, default=None,
+                        help="Round coordinates to this many decimals (e.g. 8 for EPSG:4326, 3 for metres)")
+    parser.add_argument("--compact", action="store_true", help="Write GeoJSON without whitespace")
+    args = parser.parse_args(argv)
+
+    generate_plant_points(args.boundary, args.output, layer=args.layer, method=args.method,
+                          workers=args.workers, output_crs=args.output_crs, indent=args.indent,
+                          precision=args.precision, compact=args.compact)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Headless NumPy/Shapely plant grid engine.
+
+Builds the same rotated vine lattice as plant_generation.py, but as arrays:
+the candidate grid is rotated in one shot and tested for containment with
+shapely's vectorized predicates instead of one QgsGeometry per point.
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import shapely
+
+import instrumentation
+from instrumentation import stage
+
+# Conversion factor for feet to meters
+FEET_TO_METERS = 0.3048
+
+# Expand the grid beyond the bounding box (same as plant_generation.py)
+BUFFER_FACTOR = 1.5
+
+# Upper bound on candidates held in memory at once
+MAX_CANDIDATES_PER_CHUNK = 1_000_000
+
+PLANT_COLUMNS = ["block_name", "block_id", "row_id", "plant_id", "x", "y"]
+
+# Lattice points closer than this (metres) to a crossing or a vertex height may be
+# on the boundary; the scanline path leaves them to shapely.contains_xy
+BOUNDARY_TOLERANCE = 1e-6
+
+
+def row_angle(row_orientation):
+    """Convert a row orientation (North = 0, clockwise positive) to the lattice rotation in radians."""
+    adjusted_angle = 90 - row_orientation
+    if adjusted_angle < 0:
+        adjusted_angle += 360
+    return math.radians(adjusted_angle)
+
+
+def rotate_points(x, y, cx, cy, angle_rad):
+    """Rotate arrays of points around a center (vectorized rotate_point)."""
+    cos_a, sin_a = math.cos(angle_rad), math.sin(angle_rad)
+    dx = x - cx
+    dy = y - cy
+    x_rot = cx + dx * cos_a - dy * sin_a
+    y_rot = cy + dx * sin_a + dy * cos_a
+    return x_rot, y_rot
+
+
+def buffered_extent(block_geom):
+    """Return the expanded grid extent used by plant_generation.py."""
+    x_min, y_min, x_max, y_max = block_geom.bounds
+
+    # Applied in the same order as the QGIS script so the lattice lines up
+    x_min -= (x_max - x_min) * BUFFER_FACTOR
+    x_max += (x_max - x_min) * BUFFER_FACTOR
+    y_min -= (y_max - y_min) * BUFFER_FACTOR
+    y_max += (y_max - y_min) * BUFFER_FACTOR
+    return x_min, y_min, x_max, y_max
+
+
+def lattice_index_range(origin, spacing, lower, upper, count):
+    """Return the first and last lattice index whose coordinate lies within [lower, upper]."""
+    first = max(int(math.ceil((lower - origin) / spacing)), 0)
+    last = min(int(math.floor((upper - origin) / spacing)), count - 1)
+    return first, last
+
+
+def rotated_bounds(block_geom, cx, cy, angle_rad):
+    """Bounds of the block in the unrotated lattice frame (inverse-rotated around the center)."""
+    coords = shapely.get_coordinates(block_geom)
+    x_back, y_back = rotate_points(coords[:, 0], coords[:, 1], cx, cy, -angle_rad)
+    return x_back.min(), y_back.min(), x_back.max(), y_back.max()
+
+
+def lattice_edges(block_geom, cx, cy, angle_rad):
+    """Return every ring segment of the block as (x0, y0, x1, y1) arrays in the unrotated lattice frame."""
+    rings = shapely.get_rings(shapely.get_parts(block_geom))
+    coords, ring_index = shapely.get_coordinates(rings, return_index=True)
+    x_back, y_back = rotate_points(coords[:, 0], coords[:, 1], cx, cy, -angle_rad)
+
+    # A segment joins consecutive vertices of the same ring
+    same_ring = ring_index[:-1] == ring_index[1:]
+    return x_back[:-1][same_ring], y_back[:-1][same_ring], x_back[1:][same_ring], y_back[1:][same_ring]
+
+
+def scanline_rows(xs, ys, plant_spacing, edges, tolerance=BOUNDARY_TOLERANCE):
+    """
+    Intersect each lattice row with the block edges and keep the lattice
+    columns that fall inside the resulting intervals. Columns within
+    tolerance of a crossing are kept too; they are the first or last column
+    of their run and need a containment test (see vertex_rows).
+
+    Returns (row_index, column_index) arrays, ordered by row then column.
+    """
+    x0, y0, x1, y1 = edges
+    x_origin = xs[0]
+
+    rows_per_chunk = max(1, MAX_CANDIDATES_PER_CHUNK // max(len(x0), 1))
+    row_parts, col_parts = [], []
+    for start in range(0, len(ys), rows_per_chunk):
+        y = ys[start:start + rows_per_chunk, None]
+
+        # Half-open rule so a vertex on the row line is counted once
+        crosses = (y0 <= y) != (y1 <= y)
+        row_idx, edge_idx = np.nonzero(crosses)
+        if len(row_idx) == 0:
+            continue
+        y_row = y[row_idx, 0]
+        x_cross = x0[edge_idx] + (y_row - y0[edge_idx]) * (x1[edge_idx] - x0[edge_idx]) / (y1[edge_idx] - y0[edge_idx])
+
+        # Crossings sorted along each row pair up into inside intervals
+        order = np.lexsort((x_cross, row_idx))
+        row_idx, x_cross = row_idx[order], x_cross[order]
+        interval_row = row_idx[0::2]
+        enter, leave = x_cross[0::2], x_cross[1::2]
+
+        # Lattice columns inside each interval, or within tolerance of its ends
+        first = np.maximum(np.ceil((enter - tolerance - x_origin) / plant_spacing).astype(np.int64), 0)
+        last = np.minimum(np.floor((leave + tolerance - x_origin) / plant_spacing).astype(np.int64), len(xs) - 1)
+        counts = np.maximum(last - first + 1, 0)
+
+        total = counts.sum()
+        offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        row_parts.append(start + np.repeat(interval_row, counts))
+        col_parts.append(np.repeat(first, counts) + np.arange(total) - offsets)
+
+    if not row_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(row_parts), np.concatenate(col_parts)
+
+
+def vertex_rows(ys, vertex_y, tolerance=BOUNDARY_TOLERANCE):
+    """
+    Mask of the lattice rows passing within tolerance of a block vertex.
+
+    The crossing rule cannot decide these rows: a row lying on an edge parallel
+    to the rows, or touching a vertex, is counted as crossed although its points
+    are on the boundary, which contains_xy rejects.
+    """
+    vertex_y = np.sort(vertex_y)
+    position = np.clip(np.searchsorted(vertex_y, ys), 1, len(vertex_y) - 1)
+    nearest = np.minimum(np.abs(ys - vertex_y[position - 1]), np.abs(ys - vertex_y[position]))
+    return nearest <= tolerance
+
+
+def run_ends(row_idx, col_idx):
+    """Mask of the first and last point of every run of consecutive columns in a row."""
+    new_run = np.r_[True, (row_idx[1:] != row_idx[:-1]) | (col_idx[1:] != col_idx[:-1] + 1)]
+    return new_run | np.r_[new_run[1:], True]
+
+
+def empty_plant_table():
+    return pd.DataFrame({
+        "block_name": pd.Series(dtype=object),
+        "block_id": pd.Series(dtype=np.int64),
+        "row_id": pd.Series(dtype=np.int64),
+        "plant_id": pd.Series(dtype=np.int64),
+        "x": pd.Series(dtype=np.float64),
+        "y": pd.Series(dtype=np.float64),
+    })
+
+
+def generate_block_plants(block_geom, vine_space, row_space, row_orient, block_name=None, block_id=1, method="grid"):
+    """
+    Generate the vine points of one block.
+
+    Parameters:
+    block_geom (shapely geometry): Block polygon in a metric CRS (EPSG:32610).
+    vine_space (float): Plant spacing in feet.
+    row_space (float): Row spacing in feet.
+    row_orient (float): Row orientation in degrees, North = 0 and clockwise positive.
+    block_name (str): Value written to the block_name column.
+    block_id (int): Value written to the block_id column.
+    method (str): 'grid' tests every candidate for containment, 'scanline'
+        intersects each row with the block edges and fills the inside intervals.
+
+    Returns:
+    pandas.DataFrame: One row per plant with block_name, block_id, row_id, plant_id, x, y.
+    """
+    plant_spacing = vine_space * FEET_TO_METERS
+    row_spacing = row_space * FEET_TO_METERS
+    angle_rad = row_angle(row_orient)
+
+    x_min, y_min, x_max, y_max = buffered_extent(block_geom)
+    center = block_geom.centroid
+    cx, cy = center.x, center.y
+
+    num_cols = int(math.floor((x_max - x_min) / plant_spacing)) + 1
+    num_rows = int(math.floor((y_max - y_min) / row_spacing)) + 1
+
+    # Only enumerate lattice indices that can land inside the block once rotated;
+    # the lattice keeps the buffered origin so positions match plant_generation.py
+    bx_min, by_min, bx_max, by_max = rotated_bounds(block_geom, cx, cy, angle_rad)
+    col_first, col_last = lattice_index_range(x_min, plant_spacing, bx_min, bx_max, num_cols)
+    row_first, row_last = lattice_index_range(y_min, row_spacing, by_min, by_max, num_rows)
+    if col_first > col_last or row_first > row_last:
+        return empty_plant_table()
+
+    xs = x_min + np.arange(col_first, col_last + 1) * plant_spacing
+    ys = y_min + np.arange(row_first, row_last + 1) * row_spacing
+    num_cols, num_rows = len(xs), len(ys)
+
+    if method == "scanline":
+        shapely.prepare(block_geom)
+        with stage("scanline", block=block_name, candidates=num_cols * num_rows) as scan:
+            edges = lattice_edges(block_geom, cx, cy, angle_rad)
+            row_idx, col_idx = scanline_rows(xs, ys, plant_spacing, edges)
+
+            # Rows through a vertex are tested point by point, as in the grid path
+            on_vertex = vertex_rows(ys, np.r_[edges[1], edges[3]])
+            from_scan = ~on_vertex[row_idx]
+            row_idx, col_idx = row_idx[from_scan], col_idx[from_scan]
+            vertex_row_idx = np.repeat(np.flatnonzero(on_vertex), num_cols)
+            vertex_col_idx = np.tile(np.arange(num_cols), np.count_nonzero(on_vertex))
+
+            # Run ends may be on an edge; test them together with the vertex rows
+            check = np.r_[run_ends(row_idx, col_idx), np.ones(len(vertex_row_idx), dtype=bool)]
+            row_idx, col_idx = np.r_[row_idx, vertex_row_idx], np.r_[col_idx, vertex_col_idx]
+            x_out, y_out = rotate_points(xs[col_idx], ys[row_idx], cx, cy, angle_rad)
+            keep = np.ones(len(row_idx), dtype=bool)
+            keep[check] = shapely.contains_xy(block_geom, x_out[check], y_out[check])
+
+            order = np.lexsort((col_idx, row_idx))
+            order = order[keep[order]]
+            row_idx, col_idx, x_out, y_out = row_idx[order], col_idx[order], x_out[order], y_out[order]
+            scan.add(accepted=len(row_idx))
+        if len(row_idx) == 0:
+            return empty_plant_table()
+
+        # Renumber rows and plants the same way the grid path does
+        new_row = np.r_[True, row_idx[1:] != row_idx[:-1]]
+        row_ids = np.cumsum(new_row)
+        row_starts = np.flatnonzero(new_row)
+        plant_ids = np.arange(len(row_idx)) - np.repeat(row_starts, np.diff(np.r_[row_starts, len(row_idx)])) + 1
+
+        return pd.DataFrame({
+            "block_name": np.full(len(row_ids), block_name, dtype=object),
+            "block_id": np.full(len(row_ids), block_id, dtype=np.int64),
+            "row_id": row_ids.astype(np.int64),
+            "plant_id": plant_ids.astype(np.int64),
+            "x": x_out,
+            "y": y_out,
+        }, columns=PLANT_COLUMNS)
+    if method != "grid":
+        raise ValueError(f"Unknown generation method: {method}")
+
+    shapely.prepare(block_geom)
+
+    rows_per_chunk = max(1, MAX_CANDIDATES_PER_CHUNK // max(num_cols, 1))
+    chunks = []
+    row_id = 0
+    candidates = stage("candidates", block=block_name)
+    containment = stage("containment", block=block_name)
+    for start in range(0, num_rows, rows_per_chunk):
+        with candidates:
+            grid_x, grid_y = np.meshgrid(xs, ys[start:start + rows_per_chunk])
+            x_rot, y_rot = rotate_points(grid_x, grid_y, cx, cy, angle_rad)
+            candidates.add(candidates=grid_x.size)
+        with containment:
+            inside = shapely.contains_xy(block_geom, x_rot, y_rot)
+            containment.add(candidates=inside.size, accepted=np.count_nonzero(inside))
+
+        # Only rows with at least one point inside get a row_id
+        row_has_points = inside.any(axis=1)
+        row_ids = row_id + np.cumsum(row_has_points)
+        row_id = row_ids[-1]
+
+        # plant_id counts accepted points along each row
+        plant_ids = np.cumsum(inside, axis=1)
+
+        chunks.append((
+            np.broadcast_to(row_ids[:, None], inside.shape)[inside],
+            plant_ids[inside],
+            x_rot[inside],
+            y_rot[inside],
+        ))
+
+    if not chunks:
+        return empty_plant_table()
+
+    row_ids, plant_ids, x_out, y_out = (np.concatenate(parts) for parts in zip(*chunks))
+    return pd.DataFrame({
+        "block_name": np.full(len(row_ids), block_name, dtype=object),
+        "block_id": np.full(len(row_ids), block_id, dtype=np.int64),
+        "row_id": row_ids.astype(np.int64),
+        "plant_id": plant_ids.astype(np.int64),
+        "x": x_out,
+        "y": y_out,
+    }, columns=PLANT_COLUMNS)
+
+
+def _generate_block_task(task):
+    """Process pool entry point; the block geometry travels as WKB bytes."""
+    block_wkb, vine_space, row_space, row_orient, block_name, block_id, method = task
+    return generate_block_plants(
+        shapely.from_wkb(block_wkb), vine_space, row_space, row_orient,
+        block_name=block_name, block_id=block_id, method=method
+    )
+
+
+def _init_worker(instrument):
+    """
+    Pool initializer. A forked worker inherits the records the parent has not
+    reported yet; they are dropped so the parent does not count them twice.
+    """
+    instrumentation.drain()
+    if instrument:
+        instrumentation.enable()
+
+
+def _generate_block_worker(task):
+    """Worker process entry point; returns the plants and the stage records of the block."""
+    return _generate_block_task(task), instrumentation.drain()
+
+
+def generate_blocks(blocks, method="grid", workers=None, first_block_id=1):
+    """
+    Generate the vine points of many blocks, optionally across a process pool.
+
+    Parameters:
+    blocks (iterable of dict): One dict per block with geometry (shapely, metric CRS),
+        block_name, vine_space, row_space and row_orient.
+    method (str): Generation method passed to generate_block_plants.
+    workers (int): Number of worker processes; None or 1 runs in this process,
+        0 uses one worker per CPU.
+    first_block_id (int): block_id of the first block; ids follow the input order.
+
+    Returns:
+    pandas.DataFrame: All plants, ordered by block then row then plant.
+    """
+    tasks = [
+        (shapely.to_wkb(block["geometry"]), block["vine_space"], block["row_space"], block["row_orient"],
+         block["block_name"], block_id, method)
+        for block_id, block in enumerate(blocks, start=first_block_id)
+    ]
+
+    if workers is None or workers == 1 or len(tasks) <= 1:
+        tables = [_generate_block_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or None, initializer=_init_worker,
+                                 initargs=(instrumentation.enabled(),)) as executor:
+            # map returns results in input order, whatever order the workers finish in
+            results = list(executor.map(_generate_block_worker, tasks))
+        tables = [table for table, _ in results]
+        for _, records in results:
+            instrumentation.extend(records)
+
+    tables = [table for table in tables if len(table)]
+    if not tables:
+        return empty_plant_table()
+    return pd.concat(tables, ignore_index=True)
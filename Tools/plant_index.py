@@ -0,0 +1,239 @@
+"""
+Indexed (block, row, plant) lookup for plant GeoJSON files.
+
+A PlantIndex is built with one streaming pass over the file. For every feature
+it keeps the block, row_id, plant_id, the feature's position in the file and
+the byte range it occupies, as NumPy arrays sorted by (block, row, plant,
+position). Blocks, rows and plants are stored as codes into their sorted
+distinct values, so ids are kept as they are written (numbers, strings or
+null) and never parsed. Selecting a block or a row is then a binary search
+and a slice, and only the selected features are decoded from the file.
+
+The index is cached next to the file as <file>.<block_key>.plantidx.npz and
+rebuilt automatically when the file's size or modification time changes.
+"""
+import bisect
+import json
+import os
+
+import numpy as np
+
+from geojson_stream import FeatureReader
+from instrumentation import stage
+
+INDEX_VERSION = 2
+
+
+def _sort_key(value):
+    """Order of property values: null first, then numbers, then anything else by its JSON text."""
+    if value is None:
+        return (0, 0, "")
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value, "")
+    return (2, 0, value if isinstance(value, str) else json.dumps(value))
+
+
+def _value_codes(values):
+    """
+    Factorize property values: returns (codes, distinct values), with the codes
+    numbered in _sort_key order so comparing codes compares values.
+    """
+    lookup = {}
+    codes = [lookup.setdefault(_hashable(value), len(lookup)) for value in values]
+    distinct = sorted(lookup, key=_sort_key)
+    recode = np.empty(len(distinct), dtype=np.int32)
+    recode[[lookup[value] for value in distinct]] = np.arange(len(distinct), dtype=np.int32)
+    distinct_values = np.empty(len(distinct), dtype=object)
+    distinct_values[:] = distinct
+    return recode[np.asarray(codes, dtype=np.int32)] if codes else np.empty(0, dtype=np.int32), distinct_values
+
+
+def _hashable(value):
+    # Lists and objects are not valid ids, but must not stop the indexing
+    return json.dumps(value) if isinstance(value, (list, dict)) else value
+
+
+def _encode_values(values):
+    """Distinct values as a str array of their JSON text, so the cache needs no pickling."""
+    return np.array([json.dumps(value) for value in values], dtype=str)
+
+
+def _decode_values(encoded):
+    values = np.empty(len(encoded), dtype=object)
+    values[:] = [json.loads(text) for text in encoded.tolist()]
+    return values
+
+
+class PlantIndex:
+    """
+    Sorted, array-backed (block, row, plant) -> feature location index.
+
+    Example:
+        index = PlantIndex.load_or_build("plants.geojson", block_key="block_name")
+        for feature in index.read_features(index.block_slice("F10")):
+            ...
+    """
+
+    def __init__(self, path, block_key, blocks, block_codes, row_values, row_codes, plant_values, plant_codes,
+                 positions, starts, ends):
+        self.path = path
+        self.block_key = block_key
+        self.blocks = blocks
+        self.block_codes = block_codes
+        self.row_values = row_values
+        self.row_codes = row_codes
+        self.plant_values = plant_values
+        self.plant_codes = plant_codes
+        self.positions = positions
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def row_ids(self):
+        """row_id of every entry, as written in the file."""
+        return self.row_values[self.row_codes]
+
+    @property
+    def plant_ids(self):
+        """plant_id of every entry, as written in the file."""
+        return self.plant_values[self.plant_codes]
+
+    # -- building and caching ----------------------------------------------
+
+    @staticmethod
+    def cache_path(path, block_key="block_id"):
+        return f"{path}.{block_key}.plantidx.npz"
+
+    @staticmethod
+    def _source_stamp(path):
+        stat = os.stat(path)
+        return np.array([INDEX_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    @classmethod
+    def build(cls, path, block_key="block_id"):
+        """Index a plant GeoJSON file with one streaming pass."""
+        block_lookup = {}
+        block_codes, row_ids, plant_ids, starts, ends = [], [], [], [], []
+
+        with stage("index") as indexing, FeatureReader(path) as reader:
+            for start, end, feature in reader.iter_spans():
+                properties = feature.get("properties") or {}
+                block = properties.get(block_key)
+                block = "" if block is None else str(block)
+                block_codes.append(block_lookup.setdefault(block, len(block_lookup)))
+                row_ids.append(properties.get("row_id"))
+                plant_ids.append(properties.get("plant_id"))
+                starts.append(start)
+                ends.append(end)
+            indexing.add(accepted=len(starts))
+
+        # Number the blocks in sorted order so the code order is the name order
+        names = np.array(list(block_lookup), dtype=str)
+        name_order = np.argsort(names, kind="stable")
+        recode = np.empty(len(names), dtype=np.int32)
+        recode[name_order] = np.arange(len(names), dtype=np.int32)
+
+        block_codes = recode[np.asarray(block_codes, dtype=np.int32)] if block_codes else np.empty(0, dtype=np.int32)
+        row_codes, row_values = _value_codes(row_ids)
+        plant_codes, plant_values = _value_codes(plant_ids)
+        positions = np.arange(len(starts), dtype=np.int64)
+
+        order = np.lexsort((positions, plant_codes, row_codes, block_codes))
+        return cls(
+            path, block_key, names[name_order], block_codes[order], row_values, row_codes[order],
+            plant_values, plant_codes[order], positions[order],
+            np.asarray(starts, dtype=np.int64)[order], np.asarray(ends, dtype=np.int64)[order]
+        )
+
+    def save(self, cache_path=None):
+        np.savez(
+            cache_path or self.cache_path(self.path, self.block_key),
+            stamp=self._source_stamp(self.path), blocks=self.blocks, block_codes=self.block_codes,
+            row_values=_encode_values(self.row_values), row_codes=self.row_codes,
+            plant_values=_encode_values(self.plant_values), plant_codes=self.plant_codes, positions=self.positions,
+            starts=self.starts, ends=self.ends
+        )
+
+    @classmethod
+    def load(cls, path, block_key="block_id"):
+        """Load the cached index of path, or return None when it is missing or stale."""
+        cache_path = cls.cache_path(path, block_key)
+        if not os.path.exists(cache_path):
+            return None
+        with np.load(cache_path) as data:
+            if not np.array_equal(data["stamp"], cls._source_stamp(path)):
+                return None
+            return cls(
+                path, block_key, data["blocks"], data["block_codes"], _decode_values(data["row_values"]),
+                data["row_codes"], _decode_values(data["plant_values"]), data["plant_codes"],
+                data["positions"], data["starts"], data["ends"]
+            )
+
+    @classmethod
+    def load_or_build(cls, path, block_key="block_id", cache=True):
+        """Return the cached index of path, building (and caching) it when needed."""
+        index = cls.load(path, block_key) if cache else None
+        if index is None:
+            index = cls.build(path, block_key)
+            if cache:
+                index.save()
+        return index
+
+    # -- lookups -------------------------------------------------------------
+
+    def block_code(self, block):
+        """Code of a block name, or None when the block is not in the file."""
+        block = str(block)
+        code = np.searchsorted(self.blocks, block)
+        if code < len(self.blocks) and self.blocks[code] == block:
+            return int(code)
+        return None
+
+    def block_slice(self, block):
+        """Slice of the index entries of one block."""
+        code = self.block_code(block)
+        if code is None:
+            return slice(0, 0)
+        return slice(
+            int(np.searchsorted(self.block_codes, code, side="left")),
+            int(np.searchsorted(self.block_codes, code, side="right"))
+        )
+
+    def row_slice(self, block, row_id):
+        """Slice of the index entries of one row of a block, ordered by plant_id."""
+        block_range = self.block_slice(block)
+        code = self.row_code(row_id)
+        if code is None:
+            return slice(block_range.start, block_range.start)
+        rows = self.row_codes[block_range]
+        return slice(
+            block_range.start + int(np.searchsorted(rows, code, side="left")),
+            block_range.start + int(np.searchsorted(rows, code, side="right"))
+        )
+
+    def row_code(self, row_id):
+        """Code of a row_id, or None when no feature has it."""
+        key = _sort_key(_hashable(row_id))
+        code = bisect.bisect_left(self.row_values, key, key=_sort_key)
+        if code < len(self.row_values) and _sort_key(self.row_values[code]) == key:
+            return code
+        return None
+
+    def row_ids_of(self, block):
+        """The distinct row_ids of a block, in ascending order."""
+        return self.row_values[np.unique(self.row_codes[self.block_slice(block)])]
+
+    def read_features(self, selection):
+        """
+        Decode the features selected by a slice, boolean mask or index array
+        of the index entries, in file order.
+        """
+        starts, ends = self.starts[selection], self.ends[selection]
+        order = np.argsort(starts, kind="stable")
+        with open(self.path, "rb") as f:
+            for start, end in zip(starts[order].tolist(), ends[order].tolist()):
+                f.seek(start)
+                yield json.loads(f.read(end - start))
@@ -0,0 +1,116 @@
+"""
+Columnar plant-point store.
+
+Plant layers are written as a flat table with float64 x/y columns and typed
+attribute columns (block_name, block_id, row_id, plant_id, ...), either as
+Parquet (.parquet) or as an Arrow IPC file (.arrow / .feather). Arrow IPC
+files are read through a memory map, so loading them does not copy the data.
+The CRS is kept in the schema metadata under b"crs".
+
+pyarrow is optional; it is only imported when a columnar path is used.
+"""
+import numpy as np
+import pandas as pd
+
+PARQUET_EXTENSIONS = (".parquet", ".geoparquet")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("Columnar plant files need pyarrow (pip install pyarrow)") from exc
+    return pyarrow
+
+
+def is_columnar_path(path):
+    """True when the file extension selects the columnar format instead of GeoJSON."""
+    return str(path).lower().endswith(PARQUET_EXTENSIONS + ARROW_EXTENSIONS)
+
+
+def features_to_table(features):
+    """Build a plant table (x, y + one column per property) from GeoJSON point features."""
+    features = list(features)
+    coords = np.array([feature["geometry"]["coordinates"][:2] for feature in features], dtype=float).reshape(-1, 2)
+    table = pd.DataFrame([feature["properties"] for feature in features])
+    table["x"] = coords[:, 0]
+    table["y"] = coords[:, 1]
+    return table
+
+
+def table_to_features(table):
+    """Yield GeoJSON point features from a plant table; missing values become null."""
+    property_columns = [column for column in table.columns if column not in ("x", "y")]
+    columns = [table[column].astype(object).where(table[column].notna(), None).tolist() for column in property_columns]
+    for x, y, *values in zip(table["x"].tolist(), table["y"].tolist(), *columns):
+        yield {
+            "type": "Feature",
+            "properties": dict(zip(property_columns, values)),
+            "geometry": {"type": "Point", "coordinates": [x, y]}
+        }
+
+
+def _to_arrow(table, crs):
+    pa = _require_pyarrow()
+    table = table.copy()
+
+    # Repeated strings such as block_name are stored once per file
+    for column in table.columns:
+        if column not in ("x", "y") and pd.api.types.is_string_dtype(table[column]):
+            table[column] = table[column].astype("category")
+
+    arrow_table = pa.Table.from_pandas(table, preserve_index=False)
+    metadata = dict(arrow_table.schema.metadata or {})
+    if crs is not None:
+        metadata[b"crs"] = str(crs).encode("utf-8")
+    return arrow_table.replace_schema_metadata(metadata)
+
+
+def write_plant_table(path, table, crs=None):
+    """
+    Write a plant table to a Parquet or Arrow IPC file.
+
+    Parameters:
+    path (str): Output path; the extension picks the format.
+    table (pandas.DataFrame): Must contain x and y columns.
+    crs (str): CRS of x/y (for example "EPSG:4326"), stored in the file metadata.
+    """
+    pa = _require_pyarrow()
+    arrow_table = _to_arrow(table, crs)
+
+    if str(path).lower().endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+        pq.write_table(arrow_table, path)
+    elif str(path).lower().endswith(ARROW_EXTENSIONS):
+        with pa.OSFile(str(path), "wb") as sink:
+            with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+    else:
+        raise ValueError(f"Not a columnar plant file: {path}")
+    return len(table)
+
+
+def read_plant_arrow(path, memory_map=True):
+    """Read a columnar plant file as a pyarrow Table (memory-mapped for Arrow IPC files)."""
+    pa = _require_pyarrow()
+    if str(path).lower().endswith(PARQUET_EXTENSIONS):
+        import pyarrow.parquet as pq
+        return pq.read_table(path, memory_map=memory_map)
+    if str(path).lower().endswith(ARROW_EXTENSIONS):
+        source = pa.memory_map(str(path), "r") if memory_map else pa.OSFile(str(path), "rb")
+        return pa.ipc.open_file(source).read_all()
+    raise ValueError(f"Not a columnar plant file: {path}")
+
+
+def read_plant_table(path, memory_map=True):
+    """Read a columnar plant file into a pandas DataFrame; returns (table, crs)."""
+    arrow_table = read_plant_arrow(path, memory_map=memory_map)
+    crs = (arrow_table.schema.metadata or {}).get(b"crs")
+    table = arrow_table.to_pandas()
+
+    # Categorical string columns come back as plain values
+    for column in table.columns:
+        if isinstance(table[column].dtype, pd.CategoricalDtype):
+            table[column] = table[column].astype(object)
+    return table, crs.decode("utf-8") if crs is not None else None
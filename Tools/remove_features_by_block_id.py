@@ -1,32 +1,81 @@
-import json
+import os
 
-def remove_block_f9_features(geojson_data):
+from block_store import BlockStore
+from geojson_stream import FeatureWriter, iter_features, read_header
+from instrumentation import report, stage
+
+def remove_block_features(geojson_data, block_id):
     """
-    Removes features from the GeoJSON data where properties['block_id'] == 'F9'.
+    Removes features from the GeoJSON data where properties['block_id'] == block_id.
 
     Parameters:
         geojson_data (dict): The loaded GeoJSON as a Python dictionary.
+        block_id (str): Block to remove.
 
     Returns:
         dict: The filtered GeoJSON dictionary.
     """
     filtered_features = [
         feature for feature in geojson_data.get("features", [])
-        if feature.get("properties", {}).get("block_id") != "F10"
+        if feature.get("properties", {}).get("block_id") != block_id
     ]
     geojson_data["features"] = filtered_features
     return geojson_data
 
+def remove_block_features_file(input_path, output_path, block_id, indent=2, precision=None, compact=False):
+    """
+    Streams a GeoJSON file and drops the features whose properties['block_id'] == block_id.
+
+    input_path may also be a block store directory (see block_store.py) keyed
+    on block_id. When output_path is the store itself, only the block's file
+    is deleted; otherwise the other blocks are assembled into output_path.
+
+    Parameters:
+        input_path (str): Path to the plant GeoJSON file or block store.
+        output_path (str): Path of the filtered file (may be input_path).
+        block_id (str): Block to remove.
+        indent (int): Indentation of the output GeoJSON.
+        precision (int): Round coordinates to this many decimals (None keeps them as read).
+        compact (bool): Write without whitespace (indent is ignored).
+
+    Returns:
+        int: Number of features written.
+
+    Raises:
+        ValueError: The store is keyed on another property than block_id.
+        KeyError: The block is not in the store.
+    """
+    if BlockStore.is_store(input_path):
+        store = BlockStore(input_path)
+        # The store's blocks must be the same thing the file path filters on
+        if store.block_key != "block_id":
+            raise ValueError(f"{input_path} is keyed on {store.block_key}, not block_id")
+        if block_id not in store:
+            raise KeyError(f"Block {block_id} is not in {input_path}")
+        if os.path.abspath(output_path) == os.path.abspath(input_path):
+            store.drop(block_id)
+            return sum(entry["count"] for entry in store.manifest["blocks"])
+        return store.assemble(output_path, exclude=[block_id], indent=indent, precision=precision, compact=compact)
 
+    features = (
+        feature for feature in iter_features(input_path)
+        if feature.get("properties", {}).get("block_id") != block_id
+    )
+    with stage("filter_write") as write:
+        with FeatureWriter(output_path, header=read_header(input_path), indent=indent, precision=precision,
+                           compact=compact) as writer:
+            writer.write_many(features)
+        write.add(accepted=writer.count, bytes_written=writer.bytes_written)
+    report("remove_block_features_file")
+    return writer.count
 
 
-# Load your GeoJSON from a file
-with open("E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/Bettinelli_plant_points_KD_v1.geojson", "r") as f:
-    geojson = json.load(f)
 
-# Filter out block F9 features
-filtered_geojson = remove_block_f9_features(geojson)
 
-# Save to a new file
-with open("E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/Bettinelli_plant_points_KD_v1_filtered.geojson", "w") as f:
-    json.dump(filtered_geojson, f, indent=2)
+if __name__ == "__main__":
+    # Filter out block F10 features
+    remove_block_features_file(
+        "E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/Bettinelli_plant_points_KD_v1.geojson",
+        "E:/plant_point_generate_using_boundary_json/bentelenne/final_plant_points/Bettinelli_plant_points_KD_v1_filtered.geojson",
+        "F10"
+    )
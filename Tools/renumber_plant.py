@@ -1,19 +1,131 @@
-import json
 from collections import defaultdict
 
-def reset_plant_ids(geojson_data):
+import numpy as np
+import pandas as pd
+
+from geojson_stream import FeatureWriter, iter_features, read_header
+from instrumentation import report, stage
+from plant_store import is_columnar_path, read_plant_table, write_plant_table
+
+RENUMBER_ORDERS = ("file", "geometry")
+
+def group_codes(block_ids, row_ids):
+    """One integer code per (block_id, row_id) combination."""
+    block_codes, _ = pd.factorize(pd.Series(block_ids), use_na_sentinel=False)
+    row_codes, row_values = pd.factorize(pd.Series(row_ids), use_na_sentinel=False)
+    return block_codes.astype(np.int64) * max(len(row_values), 1) + row_codes
+
+def along_row_positions(groups, x, y):
+    """
+    Position of every plant along the principal direction of its row.
+
+    The direction is the major axis of each row's points, pointing towards
+    increasing x (increasing y for rows that run exactly north-south), so the
+    result does not depend on the order of the features.
+    """
+    count = np.bincount(groups).astype(float)
+    mean_x = np.bincount(groups, weights=x) / np.maximum(count, 1)
+    mean_y = np.bincount(groups, weights=y) / np.maximum(count, 1)
+    dx = x - mean_x[groups]
+    dy = y - mean_y[groups]
+
+    sxx = np.bincount(groups, weights=dx * dx)
+    syy = np.bincount(groups, weights=dy * dy)
+    sxy = np.bincount(groups, weights=dx * dy)
+    angle = 0.5 * np.arctan2(2 * sxy, sxx - syy)
+    return dx * np.cos(angle)[groups] + dy * np.sin(angle)[groups]
+
+def sequential_plant_ids(block_ids, row_ids, x=None, y=None, order="file"):
+    """
+    Sequential plant_id values (starting at 1) for every (block_id, row_id) group.
+
+    :param block_ids: block_id of every plant.
+    :param row_ids: row_id of every plant.
+    :param x: x coordinates, needed for order="geometry".
+    :param y: y coordinates, needed for order="geometry".
+    :param order: "file" numbers the plants of a row in input order, "geometry"
+        numbers them along the row direction (input order breaks ties).
+    :return: int64 array of plant_id values, aligned with the input.
+    """
+    if order not in RENUMBER_ORDERS:
+        raise ValueError(f"Unknown renumber order: {order}")
+
+    groups = group_codes(block_ids, row_ids)
+    if len(groups) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if order == "geometry":
+        positions = along_row_positions(groups, np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        # lexsort is stable, so input order breaks ties
+        sort_order = np.lexsort((positions, groups))
+    else:
+        sort_order = np.argsort(groups, kind="stable")
+
+    # Cumulative count within each run of equal groups in sorted order
+    sorted_groups = groups[sort_order]
+    group_start = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    run_lengths = np.diff(np.r_[group_start, len(groups)])
+    cumcount = np.arange(len(groups)) - np.repeat(group_start, run_lengths)
+
+    plant_ids = np.empty(len(groups), dtype=np.int64)
+    plant_ids[sort_order] = cumcount + 1
+    return plant_ids
+
+def renumber_table(table, order="file"):
+    """
+    Return a copy of a plant table (block_id, row_id, x, y columns) with
+    sequential plant_id values per (block_id, row_id).
+    """
+    table = table.copy()
+    table["plant_id"] = sequential_plant_ids(
+        table["block_id"].to_numpy(), table["row_id"].to_numpy(),
+        table["x"].to_numpy() if order == "geometry" else None,
+        table["y"].to_numpy() if order == "geometry" else None,
+        order=order
+    )
+    return table
+
+def _feature_keys(features, with_coordinates=False):
+    """block_id, row_id (and x, y) arrays of an iterable of features."""
+    block_ids, row_ids, coords = [], [], []
+    for feature in features:
+        properties = feature["properties"]
+        block_ids.append(properties["block_id"])
+        row_ids.append(properties["row_id"])
+        if with_coordinates:
+            coords.append(feature["geometry"]["coordinates"][:2])
+    coords = np.array(coords, dtype=float).reshape(-1, 2)
+    return block_ids, row_ids, coords[:, 0], coords[:, 1]
+
+def reset_plant_ids(geojson_data, order="file"):
     """
     Resets the plant_id values in the GeoJSON so that each block and row combination
     has plant_id values starting from 1 and incrementing sequentially.
     
     :param geojson_data: Dictionary representing the GeoJSON data.
+    :param order: "file" keeps the feature order within a row, "geometry"
+        numbers the plants along the row direction.
     :return: Updated GeoJSON dictionary.
     """
+    features = geojson_data["features"]
+    block_ids, row_ids, x, y = _feature_keys(features, with_coordinates=order == "geometry")
+    plant_ids = sequential_plant_ids(block_ids, row_ids, x, y, order=order)
+
+    for feature, plant_id in zip(features, plant_ids.tolist()):
+        feature["properties"]["plant_id"] = plant_id
+    return geojson_data
+
+def renumber_features(features):
+    """
+    Yields the features with sequential plant_id values per (block_id, row_id).
+
+    :param features: Iterable of GeoJSON features (may be a stream).
+    """
     # Dictionary to keep track of plant_id sequences per (block_id, row_id)
     plant_counters = defaultdict(lambda: 1)
     
     # Iterate through features and update plant_id
-    for feature in geojson_data["features"]:
+    for feature in features:
         properties = feature["properties"]
         block_id = properties["block_id"]
         row_id = properties["row_id"]
@@ -23,17 +135,49 @@ def reset_plant_ids(geojson_data):
         
         # Increment the counter for the next plant in the same block-row
         plant_counters[(block_id, row_id)] += 1
-    
-    return geojson_data
 
-# Example usage
-# Load the GeoJSON file
-with open("E:/plant_point_generate_using_boundary_json/final_mayacamas_files/21a_block.geojson", "r") as f:
-    geojson_data = json.load(f)
+        yield feature
+
+def reset_plant_ids_file(input_path, output_path, indent=4, order="file", precision=None, compact=False):
+    """
+    Streaming version of reset_plant_ids: renumbers a GeoJSON file feature by
+    feature, in constant memory. output_path may be the same as input_path.
+    Columnar plant files (.parquet / .arrow) are renumbered as a table.
+
+    With order="geometry" the file is read twice: once to collect the row keys
+    and coordinates as arrays, once to write the renumbered features.
+
+    :param input_path: Path to the GeoJSON file to renumber.
+    :param output_path: Path of the renumbered GeoJSON file.
+    :param order: "file" or "geometry", see sequential_plant_ids.
+    :param precision: Round GeoJSON coordinates to this many decimals (None keeps them as read).
+    :param compact: Write GeoJSON without whitespace (indent is ignored).
+    """
+    if is_columnar_path(input_path):
+        # Not memory-mapped, so the input can be overwritten
+        table, crs = read_plant_table(input_path, memory_map=False)
+        return write_plant_table(output_path, renumber_table(table, order=order), crs=crs)
+
+    if order == "file":
+        features = renumber_features(iter_features(input_path))
+    else:
+        block_ids, row_ids, x, y = _feature_keys(iter_features(input_path), with_coordinates=True)
+        plant_ids = iter(sequential_plant_ids(block_ids, row_ids, x, y, order=order).tolist())
+        features = (
+            {**feature, "properties": {**feature["properties"], "plant_id": next(plant_ids)}}
+            for feature in iter_features(input_path)
+        )
 
-# Process the GeoJSON data
-updated_geojson = reset_plant_ids(geojson_data)
+    # Features are renumbered as they are written, so this stage covers both
+    with stage("renumber_write") as write:
+        with FeatureWriter(output_path, header=read_header(input_path), indent=indent,
+                           precision=precision, compact=compact) as writer:
+            writer.write_many(features)
+        write.add(accepted=writer.count, bytes_written=writer.bytes_written)
+    report("reset_plant_ids_file")
+    return writer.count
 
-# Save the updated GeoJSON file
-with open("E:/plant_point_generate_using_boundary_json/final_mayacamas_files/21a_block.geojson", "w") as f:
-    json.dump(updated_geojson, f, indent=4)
+if __name__ == "__main__":
+    # Example usage
+    reset_plant_ids_file("E:/plant_point_generate_using_boundary_json/final_mayacamas_files/21a_block.geojson",
+                         "E:/plant_point_generate_using_boundary_json/final_mayacamas_files/21a_block.geojson")
@@ -0,0 +1,88 @@
+"""
+Check that the grid and scanline generators give the same plants.
+
+Both methods must give the same row_id/plant_id numbering and coordinates.
+The cases are the synthetic blocks plus rectangles and L-shaped blocks whose
+edges lie exactly on lattice rows and columns, where a point on the
+boundary must be left out by both methods.
+
+Example:
+    python benchmarks/check_methods.py --sizes 1 10
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import shapely
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), "Tools"))
+
+from plant_grid import FEET_TO_METERS, generate_block_plants
+
+from synthetic_blocks import CENTER, ROW_ORIENT, ROW_SPACE, SHAPES, VINE_SPACE, make_block
+
+# Row orientations at which block edges can run along lattice rows or columns
+ALIGNED_ORIENTATIONS = (0.0, 90.0, 180.0, 270.0)
+
+
+def aligned_blocks(count=50, seed=3):
+    """(name, polygon, row_orient) rectangles and L shapes with edges on lattice lines."""
+    rng = np.random.default_rng(seed)
+    blocks = [("repro_box", shapely.box(0, 0, 15.24, 9.7536), 90.0)]
+    for i in range(count):
+        orient = float(rng.choice(ALIGNED_ORIENTATIONS))
+        step_x, step_y = VINE_SPACE * FEET_TO_METERS, ROW_SPACE * FEET_TO_METERS
+        if orient in (90.0, 270.0):
+            step_x, step_y = step_y, step_x
+        width, height = rng.integers(4, 40, size=2)
+        notch_x, notch_y = rng.integers(1, width - 1), rng.integers(1, height - 1)
+        x, y = CENTER
+        if i % 2:
+            polygon = shapely.box(x, y, x + width * step_x, y + height * step_y)
+        else:
+            polygon = shapely.Polygon([
+                (x, y), (x + width * step_x, y), (x + width * step_x, y + notch_y * step_y),
+                (x + notch_x * step_x, y + notch_y * step_y), (x + notch_x * step_x, y + height * step_y),
+                (x, y + height * step_y)
+            ])
+        blocks.append((f"aligned_{i}", polygon, orient))
+    return blocks
+
+
+def compare_methods(block, row_orient):
+    """None when both methods agree, otherwise a short description of the difference."""
+    grid = generate_block_plants(block, VINE_SPACE, ROW_SPACE, row_orient, method="grid")
+    scanline = generate_block_plants(block, VINE_SPACE, ROW_SPACE, row_orient, method="scanline")
+    if len(grid) != len(scanline):
+        return f"grid {len(grid)} plants, scanline {len(scanline)}"
+    ids = ["row_id", "plant_id"]
+    if not np.array_equal(grid[ids].to_numpy(), scanline[ids].to_numpy()):
+        return "row_id/plant_id numbering differs"
+    if not np.allclose(grid[["x", "y"]].to_numpy(), scanline[["x", "y"]].to_numpy(), rtol=0, atol=1e-6):
+        return "coordinates differ"
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that the grid and scanline generators agree.")
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1, 10], help="Synthetic block sizes in acres")
+    parser.add_argument("--aligned", type=int, default=50, help="Number of lattice-aligned blocks")
+    args = parser.parse_args(argv)
+
+    cases = [(f"{shape} {acres} ac", make_block(shape, acres), ROW_ORIENT) for acres in args.sizes for shape in SHAPES]
+    cases += aligned_blocks(args.aligned)
+
+    failures = 0
+    for name, block, row_orient in cases:
+        difference = compare_methods(block, row_orient)
+        if difference:
+            failures += 1
+            print(f"{name:24s} orient {row_orient:5.1f}: {difference}")
+    print(f"{len(cases) - failures} of {len(cases)} blocks agree")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Benchmark the plant point generators on synthetic blocks.
+
+Every generator is run on every (shape, size) case from synthetic_blocks.py.
+The timing runs report the best of --repeat. A separate run under tracemalloc
+records peak Python/NumPy memory, so tracing does not slow the timed runs.
+Results go to a JSON file. --compare checks them against an earlier results
+file and flags slowdowns.
+
+Example:
+    python benchmarks/run_benchmarks.py --sizes 1 10 --output before.json
+    python benchmarks/run_benchmarks.py --sizes 1 10 --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import shapely
+from shapely.geometry import mapping
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "Tools"))
+sys.path.insert(0, REPO_DIR)
+
+from conversion import convert_first_to_second, transform_coordinates
+from generate_points_from_boundary import filter_points_outside_boundary, generate_parallel_rows
+from geojson_stream import iter_features, write_features
+from line_to_points import generate_points_with_spacing
+from line_to_points_after_smooth import generate_points_on_smoothed_lines
+from plant_grid import FEET_TO_METERS, generate_block_plants
+from plant_store import table_to_features
+from renumber_plant import reset_plant_ids
+
+from synthetic_blocks import (ROW_ORIENT, ROW_SPACE, SHAPES, SIZES_ACRES, VINE_SPACE, WORKING_CRS, block_rows,
+                              make_block, to_wgs84)
+
+UTM_CRS = {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::32610"}}
+WGS84_CRS = {"type": "name", "properties": {"name": "urn:ogc:def:crs:OGC:1.3:CRS84"}}
+
+# The geopy path solves one geodesic per coordinate; keep it to small blocks
+GEODESIC_MAX_ACRES = 10
+
+# A benchmark this much slower than the baseline is reported as a regression
+REGRESSION_THRESHOLD = 1.10
+
+
+def count_features(path):
+    return sum(1 for _ in iter_features(path))
+
+
+class Case:
+    """Input files and data of one (shape, acres) case, written to a temporary directory."""
+
+    def __init__(self, shape, acres, directory):
+        self.shape = shape
+        self.acres = acres
+        self.directory = directory
+        self.block = make_block(shape, acres)
+        self.block_wgs84 = to_wgs84([self.block])[0]
+
+        # Boundary, in WGS84
+        self.boundary_path = self.path("boundary.geojson")
+        write_features(self.boundary_path, [{
+            "type": "Feature", "properties": {"block_name": shape},
+            "geometry": mapping(self.block_wgs84)
+        }], header={"name": "boundary", "crs": WGS84_CRS})
+
+        # Generated plants, in EPSG:32610 with block/row/plant ids
+        self.plants = generate_block_plants(self.block, VINE_SPACE, ROW_SPACE, ROW_ORIENT, block_name=shape)
+        self.plants_path = self.path("plants_utm.geojson")
+        write_features(self.plants_path, table_to_features(self.plants), header={"name": "plants", "crs": UTM_CRS})
+        self.plants_geojson = {"type": "FeatureCollection", "features": list(table_to_features(self.plants))}
+
+        # Candidate points on the whole bounding rectangle (about half fall outside the block), in WGS84
+        candidates = generate_block_plants(shapely.box(*self.block.bounds), VINE_SPACE, ROW_SPACE, ROW_ORIENT)
+        lons, lats = transform_coordinates(candidates[["x", "y"]].to_numpy(), WORKING_CRS, "EPSG:4326")
+        candidates["x"], candidates["y"] = lons, lats
+        self.candidates_path = self.path("candidates.geojson")
+        self.candidate_count = write_features(self.candidates_path, table_to_features(candidates),
+                                              header={"name": "candidates", "crs": WGS84_CRS})
+
+        # Row centre lines, in WGS84
+        self.rows_path = self.path("rows.geojson")
+        write_features(self.rows_path, (
+            {"type": "Feature", "properties": {"row_id": row_id}, "geometry": mapping(row)}
+            for row_id, row in enumerate(to_wgs84(block_rows(shape, acres)), start=1)
+        ), header={"name": "rows", "crs": WGS84_CRS})
+
+        # Corners of the minimum rotated rectangle, as generate_parallel_rows expects
+        rectangle = shapely.minimum_rotated_rectangle(self.block)
+        self.rectangle_geojson = {"type": "FeatureCollection", "features": [{
+            "type": "Feature", "properties": {}, "geometry": mapping(to_wgs84([rectangle])[0])
+        }]}
+        side_lengths = np.hypot(*np.diff(shapely.get_coordinates(rectangle), axis=0).T)
+        self.points_per_row = max(2, int(side_lengths.min() // (VINE_SPACE * FEET_TO_METERS)) + 1)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+
+def benchmark_functions(case, geodesic_max_acres=GEODESIC_MAX_ACRES):
+    """
+    (name, function) pairs for one case. Each function runs one operation and
+    returns the number of points it produced or processed.
+    """
+    output_path = case.path("output.geojson")
+    row_spacing = ROW_SPACE * FEET_TO_METERS
+
+    def grid(method):
+        return lambda: len(generate_block_plants(case.block, VINE_SPACE, ROW_SPACE, ROW_ORIENT, method=method))
+
+    def parallel_rows(method):
+        return lambda: len(generate_parallel_rows(case.rectangle_geojson, num_points=case.points_per_row,
+                                                  row_spacing=row_spacing, method=method)["features"])
+
+    def filter_points():
+        filter_points_outside_boundary(case.boundary_path, case.candidates_path, output_path)
+        return case.candidate_count
+
+    def spacing():
+        generate_points_with_spacing(case.rows_path, output_path, spacing_feet=VINE_SPACE)
+        return count_features(output_path)
+
+    def smoothed():
+        generate_points_on_smoothed_lines(case.rows_path, output_path, spacing_feet=VINE_SPACE)
+        return count_features(output_path)
+
+    def renumber(order):
+        # Renumbering only rewrites plant_id, so the same data can be reused between runs
+        return lambda: len(reset_plant_ids(case.plants_geojson, order=order)["features"])
+
+    def convert():
+        convert_first_to_second(case.plants_path, output_path)
+        return len(case.plants)
+
+    functions = [
+        ("grid_generation[grid]", grid("grid")),
+        ("grid_generation[scanline]", grid("scanline")),
+        ("generate_parallel_rows[geod]", parallel_rows("geod")),
+        ("generate_parallel_rows[projected]", parallel_rows("projected")),
+    ]
+    if case.acres <= geodesic_max_acres:
+        functions.append(("generate_parallel_rows[geodesic]", parallel_rows("geodesic")))
+    functions += [
+        ("filter_points_outside_boundary", filter_points),
+        ("generate_points_with_spacing", spacing),
+        ("generate_points_on_smoothed_lines", smoothed),
+        ("reset_plant_ids[file]", renumber("file")),
+        ("reset_plant_ids[geometry]", renumber("geometry")),
+        ("convert_first_to_second", convert),
+    ]
+    return functions
+
+
+def measure(function, repeat):
+    """Best wall time of repeat runs, then peak traced memory of one more run."""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            points = function()
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return points, min(times), peak
+
+
+def run_benchmarks(shapes=SHAPES, sizes=SIZES_ACRES, repeat=3, only=None, geodesic_max_acres=GEODESIC_MAX_ACRES):
+    """Run every benchmark on every case; returns the list of result records."""
+    results = []
+    for acres in sizes:
+        for shape in shapes:
+            with tempfile.TemporaryDirectory(prefix="plant_bench_") as directory:
+                case = Case(shape, acres, directory)
+                for name, function in benchmark_functions(case, geodesic_max_acres):
+                    if only and not any(name.startswith(prefix) for prefix in only):
+                        continue
+                    points, seconds, peak = measure(function, repeat)
+                    results.append({
+                        "benchmark": name,
+                        "shape": shape,
+                        "acres": acres,
+                        "points": points,
+                        "seconds": seconds,
+                        "points_per_second": points / seconds if seconds > 0 else None,
+                        "peak_memory_bytes": peak,
+                    })
+                    print(f"{name:36s} {shape:12s} {acres:>5} ac  {points:>9} pts  {seconds:9.4f} s  "
+                          f"{points / max(seconds, 1e-12):>12.0f} pts/s  {peak / 2 ** 20:8.1f} MiB")
+    return results
+
+
+def environment():
+    """Versions and machine details stored with the results."""
+    try:
+        commit = subprocess.run(["git", "-C", REPO_DIR, "rev-parse", "HEAD"],
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    import pandas
+    import pyproj
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "shapely": shapely.__version__,
+        "pandas": pandas.__version__,
+        "pyproj": pyproj.__version__,
+    }
+
+
+def compare(results, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Print the time ratio against a baseline results file; returns the regressed records."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["benchmark"], r["shape"], r["acres"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        before = baseline.get((result["benchmark"], result["shape"], result["acres"]))
+        if before is None or not before["seconds"]:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        flag = "  SLOWER" if ratio > threshold else ""
+        print(f"{result['benchmark']:36s} {result['shape']:12s} {result['acres']:>5} ac  x{ratio:6.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the plant point generators on synthetic blocks.")
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("--sizes", nargs="+", type=float, default=list(SIZES_ACRES), help="Block sizes in acres")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (best is kept)")
+    parser.add_argument("--only", nargs="+", help="Run only the benchmarks whose name starts with one of these")
+    parser.add_argument("--geodesic-max-acres", type=float, default=GEODESIC_MAX_ACRES,
+                        help="Largest block on which the per-point geopy path is timed")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Time ratio above which a benchmark counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.shapes, args.sizes, args.repeat, args.only, args.geodesic_max_acres)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmarks slower than x{args.threshold} of {args.compare}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Synthetic vineyard blocks for the benchmarks.
+
+Every block is built in EPSG:32610 (metres) around a fixed point in Napa
+and scaled to an exact area, so runs are reproducible and sizes are
+comparable between shapes. Random jitter uses a fixed seed.
+"""
+import math
+
+import numpy as np
+import pyproj
+import shapely
+from shapely import affinity
+from shapely.geometry import LineString, Polygon
+
+WORKING_CRS = "EPSG:32610"
+SQUARE_METERS_PER_ACRE = 4046.8564224
+
+# Somewhere in Napa valley, in EPSG:32610
+CENTER = (560000.0, 4240000.0)
+
+SHAPES = ("convex", "concave", "many_vertex", "elongated", "curved")
+SIZES_ACRES = (1, 10, 100, 500)
+
+# Planting used for every block (feet, degrees from North)
+VINE_SPACE = 5.0
+ROW_SPACE = 8.0
+ROW_ORIENT = 30.0
+
+
+def _scaled(polygon, acres):
+    """Scale a polygon around CENTER to the requested area."""
+    factor = math.sqrt(acres * SQUARE_METERS_PER_ACRE / polygon.area)
+    return affinity.scale(polygon, factor, factor, origin=CENTER)
+
+
+def convex_block(acres):
+    """Rotated 3:2 rectangle with one corner cut off."""
+    cx, cy = CENTER
+    polygon = Polygon([(cx - 150, cy - 100), (cx + 150, cy - 100), (cx + 150, cy + 40), (cx + 90, cy + 100), (cx - 150, cy + 100)])
+    return _scaled(affinity.rotate(polygon, 12, origin=CENTER), acres)
+
+
+def concave_block(acres):
+    """L-shaped block with a notch, so many rows are split in two."""
+    cx, cy = CENTER
+    polygon = Polygon([
+        (cx - 100, cy - 100), (cx + 100, cy - 100), (cx + 100, cy + 100), (cx + 20, cy + 100),
+        (cx + 20, cy - 20), (cx - 40, cy - 20), (cx - 40, cy + 100), (cx - 100, cy + 100)
+    ])
+    return _scaled(affinity.rotate(polygon, -8, origin=CENTER), acres)
+
+
+def many_vertex_block(acres, num_vertices=4000, seed=7):
+    """Irregular, surveyed-looking outline with thousands of vertices (star-shaped, so always valid)."""
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, num_vertices, endpoint=False)
+    radius = 100 * (1 + 0.15 * np.sin(5 * angles) + 0.01 * rng.standard_normal(num_vertices))
+    polygon = Polygon(np.column_stack((CENTER[0] + radius * np.cos(angles), CENTER[1] + radius * np.sin(angles))))
+    return _scaled(polygon, acres)
+
+
+def elongated_block(acres):
+    """Long 25:1 strip, oblique to the rows."""
+    cx, cy = CENTER
+    polygon = Polygon([(cx - 500, cy - 20), (cx + 500, cy - 20), (cx + 500, cy + 20), (cx - 500, cy + 20)])
+    return _scaled(affinity.rotate(polygon, 55, origin=CENTER), acres)
+
+
+def _sector_radii(acres):
+    """Inner/outer radius of the quarter annulus used by the curved block (outer = 2 x inner)."""
+    inner = math.sqrt(acres * SQUARE_METERS_PER_ACRE * 4 / (3 * math.pi))
+    return inner, 2 * inner
+
+
+def curved_block(acres, num_vertices=256):
+    """Quarter annulus; its rows are concentric arcs (see block_rows)."""
+    inner, outer = _sector_radii(acres)
+    angles = np.linspace(0, np.pi / 2, num_vertices)
+    outer_ring = np.column_stack((CENTER[0] + outer * np.cos(angles), CENTER[1] + outer * np.sin(angles)))
+    inner_ring = np.column_stack((CENTER[0] + inner * np.cos(angles[::-1]), CENTER[1] + inner * np.sin(angles[::-1])))
+    return Polygon(np.vstack((outer_ring, inner_ring)))
+
+
+BLOCK_BUILDERS = {
+    "convex": convex_block,
+    "concave": concave_block,
+    "many_vertex": many_vertex_block,
+    "elongated": elongated_block,
+    "curved": curved_block,
+}
+
+
+def make_block(shape, acres):
+    """Block polygon of one shape and size, in EPSG:32610."""
+    return BLOCK_BUILDERS[shape](acres)
+
+
+def block_rows(shape, acres, row_space=ROW_SPACE, row_orient=ROW_ORIENT):
+    """
+    Row centre lines of a block in EPSG:32610.
+
+    Straight rows follow row_orient (North = 0, clockwise) and are clipped to
+    the block, so concave blocks get split rows; the curved block gets
+    concentric arcs with 8 vertices per arc, which is what the smoothing
+    benchmark is for.
+    """
+    row_spacing = row_space * 0.3048
+    if shape == "curved":
+        inner, outer = _sector_radii(acres)
+        margin = 0.01
+        rows = []
+        for radius in np.arange(inner + row_spacing / 2, outer, row_spacing):
+            angles = np.linspace(margin, np.pi / 2 - margin, 8)
+            rows.append(LineString(np.column_stack((CENTER[0] + radius * np.cos(angles), CENTER[1] + radius * np.sin(angles)))))
+        return rows
+
+    block = make_block(shape, acres)
+    x_min, y_min, x_max, y_max = block.bounds
+    half = math.hypot(x_max - x_min, y_max - y_min)
+    direction = math.radians(row_orient)
+    dx, dy = math.sin(direction), math.cos(direction)
+
+    # One line per row, offset perpendicular to the row direction through the block centre
+    offsets = np.arange(-half, half, row_spacing)
+    px, py = CENTER[0] + offsets * dy, CENTER[1] - offsets * dx
+    ends = np.stack((
+        np.column_stack((px - half * dx, py - half * dy)),
+        np.column_stack((px + half * dx, py + half * dy)),
+    ), axis=1)
+    rows = shapely.intersection(shapely.linestrings(ends), block)
+    return list(rows[~shapely.is_empty(rows)])
+
+
+def to_wgs84(geometries):
+    """Transform EPSG:32610 shapely geometries to EPSG:4326 (lon, lat)."""
+    transformer = pyproj.Transformer.from_crs(WORKING_CRS, "EPSG:4326", always_xy=True)
+    return [shapely.transform(geometry, lambda xy: np.column_stack(transformer.transform(xy[:, 0], xy[:, 1])))
+            for geometry in geometries]
@@ -1,80 +1,273 @@
 import geopandas as gpd
-from shapely.geometry import LineString, Point
+import shapely
+from shapely.geometry import LineString, Point, mapping
 from scipy.interpolate import splprep, splev
 import numpy as np
+import pandas as pd
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-def smooth_line_with_bspline(line, smoothing=0):
-    coords = np.array(line.coords)
+# Shared helpers live in Tools/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Tools"))
+from geojson_stream import write_features
+from instrumentation import report, stage
+from line_to_points import WGS84_CRS, as_linestrings, points_along_lines, points_table
+from plant_store import is_columnar_path, table_to_features, write_plant_table
+
+# Samples used to build the arc-length lookup table when no tolerance is given
+SPLINE_SAMPLES = 500
+
+# Default positional tolerance of the adaptive sampler, in CRS units (feet in EPSG:2227)
+TOLERANCE_FEET = 0.01
+
+# Bounds on the adaptive sample count of one row
+MIN_SPLINE_SAMPLES = 16
+MAX_SPLINE_SAMPLES = 1_000_000
+
+def fit_bspline(coords, smoothing=0):
+    """Fit a parametric B-spline through the row coordinates; returns tck, or None if it cannot be fitted."""
     x, y = coords[:, 0], coords[:, 1]
     m = len(x)
 
     if m < 2:
-        return line
+        return None
 
     k = min(3, m - 1)
     try:
         tck, _ = splprep([x, y], s=smoothing, k=k)
-        u_fine = np.linspace(0, 1, 500)
-        x_smooth, y_smooth = splev(u_fine, tck)
-        smooth_coords = list(zip(x_smooth, y_smooth))
-        return LineString(smooth_coords)
+        return tck
     except Exception as e:
         print(f"[Warning] Failed to smooth line with {m} points: {e}")
+        return None
+
+def adaptive_sample_count(tck, spacing=None, tolerance=TOLERANCE_FEET):
+    """
+    Estimate how many samples the arc-length table of a spline needs.
+
+    A chord of arc length h on a curve of curvature k deviates from it by about
+    k*h^2/8, and n such chords shorten the row by about L*k^2*h^2/24, which
+    shifts the last plants along the row. h is picked so that both stay below
+    tolerance, using the largest and the mean squared curvature of the spline;
+    it is never longer than the plant spacing. The curvature is only sampled,
+    so this is a starting point: sample_spline_at_spacing checks it.
+    """
+    num_coefficients = len(tck[1][0])
+    u_pilot = np.linspace(0, 1, max(64, 8 * num_coefficients))
+    dx, dy = splev(u_pilot, tck, der=1)
+    # A linear spline (two-vertex row) is straight between its knots
+    if tck[2] >= 2:
+        ddx, ddy = splev(u_pilot, tck, der=2)
+    else:
+        ddx, ddy = np.zeros_like(dx), np.zeros_like(dy)
+
+    speed = np.hypot(dx, dy)
+    du = np.diff(u_pilot)
+    length = np.sum((speed[1:] + speed[:-1]) / 2 * du)
+    curvature = np.abs(dx * ddy - dy * ddx) / np.maximum(speed, 1e-12) ** 3
+
+    step = length if spacing is None else min(spacing, length)
+    max_curvature = curvature.max()
+    if max_curvature > 0:
+        weighted = curvature ** 2 * speed
+        mean_sq_curvature = np.sum((weighted[1:] + weighted[:-1]) / 2 * du) / max(length, 1e-12)
+        step = min(step, np.sqrt(8 * tolerance / max_curvature))
+        step = min(step, np.sqrt(24 * tolerance / max(length * mean_sq_curvature, 1e-12)))
+
+    num_samples = int(np.ceil(length / max(step, 1e-12))) + 1
+    return int(np.clip(num_samples, MIN_SPLINE_SAMPLES, MAX_SPLINE_SAMPLES))
+
+def arc_length_table(tck, num_samples=SPLINE_SAMPLES):
+    """Sample the spline and return (u, x, y, cumulative length) arrays."""
+    u_fine = np.linspace(0, 1, num_samples)
+    x_smooth, y_smooth = splev(u_fine, tck)
+    cumulative = np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(x_smooth), np.diff(y_smooth)))))
+    return u_fine, np.asarray(x_smooth), np.asarray(y_smooth), cumulative
+
+def plants_from_table(tck, spacing, num_samples):
+    """Plants every spacing along the spline using a num_samples lookup table; see sample_spline_at_spacing."""
+    u_fine, x_smooth, y_smooth, cumulative = arc_length_table(tck, num_samples)
+
+    total_length = cumulative[-1]
+    num_points = int(total_length // spacing) + 1
+    distances = np.arange(num_points) * spacing
+
+    # Invert the cumulative-length table to get the parameter of each plant
+    u_plants = np.interp(distances, cumulative, u_fine)
+    x_plants, y_plants = splev(u_plants, tck)
+    return np.asarray(x_plants), np.asarray(y_plants), x_smooth, y_smooth
+
+def sample_spline_at_spacing(tck, spacing, tolerance=TOLERANCE_FEET, num_samples=None):
+    """
+    Evaluate the spline directly at the parameters whose arc length is a
+    multiple of spacing. Returns (plant x, plant y, smoothed x, smoothed y) arrays.
+
+    Unless num_samples is given, the lookup table starts at
+    adaptive_sample_count and is doubled until the plants move by less than
+    tolerance between n and 2n samples; the table error shrinks about 4x per
+    doubling, so the plants of the finer table are within tolerance too.
+    Rows that reach MAX_SPLINE_SAMPLES first are reported with a warning.
+    """
+    if num_samples is not None:
+        return plants_from_table(tck, spacing, num_samples)
+
+    num_samples = adaptive_sample_count(tck, spacing, tolerance)
+    result = plants_from_table(tck, spacing, num_samples)
+    while num_samples < MAX_SPLINE_SAMPLES:
+        # 2n - 1 samples keep every sample of the coarser table
+        num_samples = min(2 * num_samples - 1, MAX_SPLINE_SAMPLES)
+        finer = plants_from_table(tck, spacing, num_samples)
+        # A plant right at the row end may come and go; compare the shared ones
+        shared = min(len(result[0]), len(finer[0]))
+        shift = np.hypot(finer[0][:shared] - result[0][:shared], finer[1][:shared] - result[1][:shared])
+        result = finer
+        if shared == 0 or shift.max() <= tolerance:
+            return result
+    print(f"[Warning] Row did not reach the {tolerance} tolerance with {MAX_SPLINE_SAMPLES} spline samples")
+    return result
+
+def smooth_and_sample_row(task):
+    """
+    Fit one row and sample its plants; runs in a worker process when workers > 1.
+
+    task is (row coordinates array, smoothing, spacing, tolerance). Returns
+    (plant x, plant y, smoothed x, smoothed y) arrays, or None when the spline cannot be fitted.
+    """
+    row_coords, smoothing, spacing, tolerance = task
+    tck = fit_bspline(row_coords, smoothing=smoothing)
+    if tck is None:
+        return None
+    return sample_spline_at_spacing(tck, spacing, tolerance)
+
+def smooth_line_with_bspline(line, smoothing=0, tolerance=TOLERANCE_FEET):
+    tck = fit_bspline(np.array(line.coords), smoothing=smoothing)
+    if tck is None:
         return line
+    _, x_smooth, y_smooth, _ = arc_length_table(tck, adaptive_sample_count(tck, tolerance=tolerance))
+    return LineString(np.column_stack((x_smooth, y_smooth)))
 
-def generate_points_on_smoothed_lines(input_geojson_path, output_points_path, spacing_feet=5, smoothing=0, output_smooth_line_path=None):
-    gdf = gpd.read_file(input_geojson_path)
-    gdf = gdf.to_crs(epsg=2227)
+def generate_points_on_smoothed_lines(input_geojson_path, output_points_path, spacing_feet=5, smoothing=0, output_smooth_line_path=None,
+                                      tolerance_feet=TOLERANCE_FEET, workers=None, indent=None, precision=None,
+                                      compact=False):
+    """
+    Place plants every spacing_feet along each B-spline-smoothed row.
 
-    points = []
-    smoothed_lines = []
+    tolerance_feet bounds the positional error of the plants against the
+    exact spline (chord deviation and accumulated arc-length error); the
+    sample count of each row is refined until it holds, see
+    sample_spline_at_spacing.
+    workers > 1 fits the splines in that many processes (0 = one per CPU);
+    rows are sent as coordinate arrays and results keep the input row order.
+    precision rounds the written coordinates to that many decimals; compact
+    writes GeoJSON without whitespace.
+    """
+    with stage("read") as read:
+        gdf = gpd.read_file(input_geojson_path)
+        read.add(accepted=len(gdf))
+    with stage("reproject", candidates=len(gdf)):
+        gdf = gdf.to_crs(epsg=2227)
+
+    # Flatten MultiLineStrings and skip anything that is not a line
+    lines = as_linestrings(gdf.geometry.values)
+    keep = pd.notna(lines)
+    lines = lines[keep]
+    row_ids = gdf['row_id'].to_numpy()[keep] if 'row_id' in gdf.columns else np.full(len(lines), None)
+
+    # Vertex arrays of all rows at once; row i owns coords[starts[i]:starts[i + 1]]
+    coords, coord_index = shapely.get_coordinates(lines, return_index=True)
+    starts = np.searchsorted(coord_index, np.arange(len(lines) + 1))
+
+    plant_xy = [None] * len(lines)
+    smooth_xy = [None] * len(lines)
+    unsmoothed = []
 
-    for _, row in gdf.iterrows():
-        row_id = row.get('row_id')
-        geom = row.geometry
+    # Evenly spaced points straight from the spline, one array per row
+    tasks = [(coords[starts[i]:starts[i + 1]], smoothing, spacing_feet, tolerance_feet) for i in range(len(lines))]
+    with stage("spline_fit", candidates=len(tasks)) as spline_fit:
+        if workers is not None and workers != 1 and len(tasks) > 1:
+            num_workers = workers or os.cpu_count()
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                results = list(executor.map(smooth_and_sample_row, tasks, chunksize=max(1, len(tasks) // (num_workers * 4))))
+        else:
+            results = [smooth_and_sample_row(task) for task in tasks]
+        spline_fit.add(accepted=sum(result is not None for result in results))
 
-        if geom.geom_type == 'MultiLineString':
-            geom = LineString([pt for part in geom.geoms for pt in part.coords])
-        elif geom.geom_type != 'LineString':
+    for i, result in enumerate(results):
+        if result is None:
+            unsmoothed.append(i)
             continue
+        x_row, y_row, x_smooth, y_smooth = result
+        plant_xy[i] = (x_row, y_row)
+        smooth_xy[i] = (x_smooth, y_smooth)
 
-        smooth_line = smooth_line_with_bspline(geom, smoothing=smoothing)
-
-        # Store the smoothed line
-        smoothed_lines.append({
-            "geometry": smooth_line,
-            "row_id": row_id
-        })
-
-        # Generate evenly spaced points
-        total_length = smooth_line.length
-        num_points = int(total_length // spacing_feet) + 1
-        distances = [i * spacing_feet for i in range(num_points)]
-
-        for i, dist in enumerate(distances):
-            pt = smooth_line.interpolate(dist)
-            points.append({
-                "geometry": pt,
-                "row_id": row_id,
-                "plant_id": i + 1
-            })
-
-    # Export points
-    points_gdf = gpd.GeoDataFrame(points, geometry="geometry", crs="EPSG:2227").to_crs(epsg=4326)
-    points_gdf.to_file(output_points_path, driver="GeoJSON")
+    # Rows that could not be smoothed: one bulk interpolation along their original polylines
+    if unsmoothed:
+        with stage("interpolate_unsmoothed", candidates=len(unsmoothed)):
+            line_index, _, points = points_along_lines(lines[unsmoothed], spacing_feet)
+        point_coords = shapely.get_coordinates(points)
+        point_starts = np.searchsorted(line_index, np.arange(len(unsmoothed) + 1))
+        for k, i in enumerate(unsmoothed):
+            row_points = point_coords[point_starts[k]:point_starts[k + 1]]
+            plant_xy[i] = (row_points[:, 0], row_points[:, 1])
+            smooth_xy[i] = (coords[starts[i]:starts[i + 1], 0], coords[starts[i]:starts[i + 1], 1])
+
+    plant_x = [x_row for x_row, _ in plant_xy]
+    plant_y = [y_row for _, y_row in plant_xy]
+    row_counts = [len(x_row) for x_row in plant_x]
+
+    # Store the smoothed lines
+    smoothed_lines = []
+    if output_smooth_line_path:
+        smoothed_lines = [
+            {"geometry": LineString(np.column_stack(xy)), "row_id": row_id}
+            for xy, row_id in zip(smooth_xy, row_ids)
+        ]
+
+    # Export points; plant_id restarts at 1 on every row
+    row_counts = np.asarray(row_counts, dtype=np.int64)
+    row_starts = np.cumsum(row_counts) - row_counts
+    points_gdf = gpd.GeoDataFrame(
+        {
+            "row_id": pd.Series(row_ids, dtype=object).infer_objects().repeat(row_counts).to_numpy(),
+            "plant_id": np.arange(row_counts.sum()) - np.repeat(row_starts, row_counts) + 1,
+        },
+        geometry=gpd.points_from_xy(
+            np.concatenate(plant_x) if plant_x else [],
+            np.concatenate(plant_y) if plant_y else [],
+        ),
+        crs="EPSG:2227"
+    )
+    with stage("reproject_points", candidates=len(points_gdf)):
+        points_gdf = points_gdf.to_crs(epsg=4326)
+    with stage("write", accepted=len(points_gdf)) as write:
+        table = points_table(points_gdf, precision)
+        if is_columnar_path(output_points_path):
+            write_plant_table(output_points_path, table, crs="EPSG:4326")
+        else:
+            header = {"name": os.path.splitext(os.path.basename(output_points_path))[0], "crs": WGS84_CRS}
+            write_features(output_points_path, table_to_features(table), header=header, indent=indent,
+                           compact=compact)
+        write.add(bytes_written=os.path.getsize(output_points_path))
     print(f"Generated {len(points_gdf)} smoothed points → {output_points_path}")
 
     # Export smoothed lines (if requested)
     if output_smooth_line_path:
         smooth_gdf = gpd.GeoDataFrame(smoothed_lines, geometry="geometry", crs="EPSG:2227").to_crs(epsg=4326)
-        smooth_gdf.to_file(output_smooth_line_path, driver="GeoJSON")
+        header = {"name": os.path.splitext(os.path.basename(output_smooth_line_path))[0], "crs": WGS84_CRS}
+        write_features(output_smooth_line_path, (
+            {"type": "Feature", "properties": {"row_id": row_id}, "geometry": mapping(line)}
+            for row_id, line in zip(pd.Series(smooth_gdf["row_id"], dtype=object).infer_objects().tolist(), smooth_gdf.geometry)
+        ), header=header, indent=indent, precision=precision, compact=compact)
         print(f"Exported smoothed curves → {output_smooth_line_path}")
 
+    report("generate_points_on_smoothed_lines")
 
-generate_points_on_smoothed_lines(
-    "E:/plant_point_generate_using_boundary_json/curved_row/curved_row_v1.geojson", 
-    "E:/plant_point_generate_using_boundary_json/curved_row/curved_row_points_smooth_v2_5.geojson",
-    spacing_feet=4,
-    smoothing=5, # Try 0 (interpolate exactly), or increase for more smoothing
-    output_smooth_line_path="E:/plant_point_generate_using_boundary_json/curved_row/curved_row_curve_smooth_v2_5.geojson"
-    )
+
+if __name__ == "__main__":
+    generate_points_on_smoothed_lines(
+        "E:/plant_point_generate_using_boundary_json/curved_row/curved_row_v1.geojson", 
+        "E:/plant_point_generate_using_boundary_json/curved_row/curved_row_points_smooth_v2_5.geojson",
+        spacing_feet=4,
+        smoothing=5, # Try 0 (interpolate exactly), or increase for more smoothing
+        output_smooth_line_path="E:/plant_point_generate_using_boundary_json/curved_row/curved_row_curve_smooth_v2_5.geojson"
+        )